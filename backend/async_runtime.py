@@ -0,0 +1,65 @@
+import time
+import asyncio
+import threading
+
+from backend.profiling import outputs_size
+
+# How many async blocks may be awaiting at once, across all runs of the process
+DEFAULT_ASYNC_LIMIT = 32
+
+
+class AsyncRunner:
+    """
+    One asyncio event loop on a daemon thread, shared by every async block
+    (`async def run(inputs, outputs)`) the process runs. Blocks waiting on
+    I/O overlap there instead of each holding a pool thread; a semaphore
+    caps how many are in flight.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loop = None
+        self.limit = None
+        self._semaphore = None
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(target=self.loop.run_forever, name="proto-async-blocks", daemon=True).start()
+
+    def set_limit(self, limit):
+        limit = limit or DEFAULT_ASYNC_LIMIT
+        if limit != self.limit:
+            # Blocks already holding the old semaphore finish under it
+            self.limit = limit
+            self._semaphore = None
+
+    async def _run(self, prepare, on_start, *args):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit or DEFAULT_ASYNC_LIMIT)
+        async with self._semaphore:
+            if on_start is not None:
+                on_start()
+            wall_start = time.perf_counter()
+            namespace = prepare(*args)
+            await namespace["run"](namespace["inputs"], namespace["outputs"])
+            wall = time.perf_counter() - wall_start
+        outputs_ns = namespace["outputs"]
+        # CPU time and traced memory can't be told apart between blocks sharing the loop
+        return outputs_ns, {"wall_s": wall, "cpu_s": None, "peak_mem_bytes": None,
+                            "output_bytes": outputs_size(outputs_ns), "target": "async"}
+
+    def submit(self, prepare, *args, on_start=None):
+        """
+        Run prepare(*args) (which execs the block body and returns its
+        namespace) and then await the body's run() on the loop. Returns a
+        concurrent Future for (outputs, profile); cancelling it cancels the
+        block's task. on_start() is called once the block gets past the
+        semaphore and starts running.
+        """
+        self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self._run(prepare, on_start, *args), self.loop)
+
+
+async_runner = AsyncRunner()
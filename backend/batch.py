@@ -0,0 +1,224 @@
+# batch.py
+#
+# Runs one graph over every record of a dataset. Each record's fields are laid
+# over the start block's outputs, the graph runs once per record on a pool of
+# worker processes, and the outputs of the graph's sink blocks are collected
+# into a single results file. Sinks are the blocks marked as outputs, as in a
+# normal run, and only they and what they read from run; a graph with no
+# marks collects every block nothing else reads from.
+#
+#   python backend/batch.py pipeline.quark records.csv -o results.jsonl --jobs 8
+#
+# Datasets: .csv (one dict per row), .jsonl/.ndjson (one JSON value per line)
+# and .npy (one record per row, needs numpy). Results: .jsonl or .pkl.
+
+import sys
+import os
+import csv
+import json
+import pickle
+import argparse
+import functools
+from pathlib import Path
+from types import SimpleNamespace
+from concurrent.futures import ProcessPoolExecutor, wait
+
+print = functools.partial(print, flush=True)
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from backend.block_executor import run_graph, topological_sort, build_dependencies, upstream_closure, graph_sinks
+from backend.code_cache import CodeCache
+from backend.events import ConsoleEventWriter, RecordingEventWriter
+from backend.graph_file import load_graph
+from backend.preload import graph_modules, worker_context
+
+
+def _coerce(text):
+    """CSV cells arrive as strings; turn numbers/true/false/null back into values."""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def load_records(path):
+    path = Path(path)
+    suffix = path.suffix.lower()
+
+    if suffix == ".csv":
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            return [{k: _coerce(v) for k, v in row.items()} for row in csv.DictReader(f)]
+
+    if suffix in (".jsonl", ".ndjson"):
+        records = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    value = json.loads(line)
+                    records.append(value if isinstance(value, dict) else {"value": value})
+        return records
+
+    if suffix == ".npy":
+        try:
+            import numpy as np
+        except ImportError:
+            raise RuntimeError("Reading .npy datasets needs numpy installed in the project environment")
+        array = np.load(path, allow_pickle=False)
+        if array.dtype.names:
+            return [{name: row[name] for name in array.dtype.names} for row in array]
+        return [{"value": row} for row in array]
+
+    raise ValueError(f"Unsupported dataset type {suffix!r} (expected .csv, .jsonl, .ndjson or .npy)")
+
+
+def find_start_block(blocks):
+    for block in blocks:
+        if block.get("is_start_block"):
+            return block
+    ordered = topological_sort(blocks)
+    if not ordered:
+        raise ValueError("Graph has no blocks")
+    return ordered[0]
+
+
+def find_sink_blocks(blocks):
+    """The blocks marked as outputs, or without marks, the blocks no other block reads from."""
+    marked = set(graph_sinks({"blocks": blocks}))
+    if marked:
+        return [b for b in blocks if b["id"] in marked]
+    read_from = set()
+    for sources in build_dependencies(blocks).values():
+        read_from |= sources
+    return [b for b in blocks if b["id"] not in read_from]
+
+
+# === Worker side: the graph is loaded once per process, then reused per record ===
+_state = None
+
+
+def _init_worker(blocks, start_id, sink_ids, preload=None):
+    global _state
+    if preload is not None:
+        initializer, initargs = preload
+        initializer(*initargs)
+    # Records are the unit of parallelism here, so don't nest process pools
+    for block in blocks:
+        if block.get("execution_target") == "process":
+            block["execution_target"] = "thread"
+    _state = SimpleNamespace(blocks=blocks, start_id=start_id, sink_ids=sink_ids, code_cache=CodeCache(),
+                             events=ConsoleEventWriter(quiet=True))
+
+
+def _run_record(item):
+    index, record = item
+    events = RecordingEventWriter(_state.events)
+    variables = run_graph(
+        _state.blocks,
+        max_workers=1,
+        code_cache=_state.code_cache,
+        overrides={_state.start_id: record},
+        events=events,
+        keep=_state.sink_ids,
+    )
+    names = {b["id"]: b["name"] for b in _state.blocks}
+    finished = {r["block_id"] for r in events.blocks.values() if r.get("status") in ("ok", "reused", "cached", "skipped")}
+    result = {"index": index, "outputs": {}, "failed": [names[bid] for bid in names if bid not in finished]}
+    for sink_id in _state.sink_ids:
+        if sink_id in variables:
+            result["outputs"][names[sink_id]] = vars(variables[sink_id])
+    return result
+
+
+def _run_chunk(items):
+    return [_run_record(item) for item in items]
+
+
+def _stop_pool(pool):
+    """Drop queued chunks and kill the workers still running one, without waiting for them."""
+    processes = list((pool._processes or {}).values())  # shutdown() forgets them
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
+
+def map_records(blocks, records, jobs=None, chunksize=None):
+    """
+    Run the graph once per record on a process pool and yield one result per
+    record ({index, outputs: {sink name: outputs dict}, failed: [block names]})
+    in record order. Used by batch runs and by map blocks.
+    """
+    start = find_start_block(blocks)
+    sink_ids = [b["id"] for b in find_sink_blocks(blocks)]
+    # Pull mode, as in run_graph_data: skip what no sink needs
+    needed = upstream_closure(build_dependencies(blocks), sink_ids)
+    blocks = [b for b in blocks if b["id"] in needed]
+
+    jobs = jobs or os.cpu_count() or 1
+    if not chunksize:
+        chunksize = max(1, len(records) // (jobs * 4))
+
+    # Every record runs the whole graph in the worker, so preload what any block imports
+    context, initializer, initargs = worker_context(graph_modules(blocks))
+    preload = (initializer, initargs) if initializer else None
+    pool = ProcessPoolExecutor(max_workers=jobs, mp_context=context, initializer=_init_worker,
+                               initargs=(blocks, start["id"], sink_ids, preload))
+    items = list(enumerate(records))
+    try:
+        chunks = [pool.submit(_run_chunk, items[i:i + chunksize]) for i in range(0, len(items), chunksize)]
+        for future in chunks:
+            # Wait in short steps rather than in result(), so a map block that is
+            # stopped or times out gets its BlockCancelled here
+            while not wait([future], timeout=0.1).done:
+                pass
+            yield from future.result()
+    except BaseException:
+        # The run was stopped, a record couldn't be sent, or the caller gave up
+        _stop_pool(pool)
+        raise
+    pool.shutdown(wait=False)
+
+
+def run_batch(graph_path, dataset_path, output_path, jobs=None, chunksize=None):
+    blocks = load_graph(graph_path)["blocks"]
+
+    records = load_records(dataset_path)
+    start = find_start_block(blocks)
+    jobs = jobs or os.cpu_count() or 1
+
+    print(f"📚 Running {Path(graph_path).name} over {len(records)} record(s) from {Path(dataset_path).name} "
+          f"with {jobs} worker(s), start block: {start['name']}")
+
+    failed = 0
+    output_path = Path(output_path)
+    results = map_records(blocks, records, jobs, chunksize)
+
+    if output_path.suffix.lower() == ".pkl":
+        collected = list(results)
+        failed = sum(1 for r in collected if r["failed"])
+        with open(output_path, "wb") as f:
+            pickle.dump(collected, f, protocol=pickle.HIGHEST_PROTOCOL)
+    else:
+        with open(output_path, "w", encoding="utf-8") as f:
+            for result in results:
+                failed += 1 if result["failed"] else 0
+                f.write(json.dumps(result, default=repr) + "\n")
+
+    print(f"✅ Batch finished: {len(records) - failed} ok, {failed} with failed blocks → {output_path}")
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a graph once per record of a dataset.")
+    parser.add_argument("graph", help=".quark or exported .json graph")
+    parser.add_argument("dataset", help=".csv, .jsonl/.ndjson or .npy file")
+    parser.add_argument("-o", "--output", default="results.jsonl", help="results file (.jsonl or .pkl)")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=None, help="records handed to a worker at a time")
+    args = parser.parse_args(argv)
+
+    failed = run_batch(args.graph, args.dataset, args.output, jobs=args.jobs, chunksize=args.chunksize)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
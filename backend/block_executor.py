@@ -1,20 +1,75 @@
 # block_executor.py
+#
+# Runs a graph of blocks. The GUI drives it through backend/worker.py; on a
+# server it runs headless, straight from a saved graph:
+#
+#   python -m backend.block_executor run project/pipeline.quark --jobs 8 --output json
+#
+# or is compiled into one plain module (see backend/graph_compiler.py):
+#
+#   python -m backend.block_executor compile project/pipeline.quark -o pipeline.py
+#
+# When blocks are marked as outputs (or named with --sink), only they and the
+# blocks they read from run; --all runs everything.
+#
+# Every run is checkpointed (backend/checkpoints.py); a failed one can be
+# picked up where it stopped with `run ... --resume <run id>`, and `runs`
+# lists the run ids of a graph.
+#
+# A block that fails has everything downstream of it skipped, while blocks
+# not depending on it carry on; blocks with "retries" are retried first
+# (backend/retry.py). The run ends with a list of what failed and what was
+# skipped, and the exit code is non-zero when any block fails. Nothing here
+# imports PyQt6.
 
+import os
 import sys
 import json
+import argparse
+import time
+import marshal
 from pathlib import Path
 from types import SimpleNamespace
-import io
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+import traceback
 import functools
 print = functools.partial(print, flush=True)
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from backend.block_runtime import run_block_profiled, run_block_in_process, get_execution_target, is_async_block, prepare_block
+from backend.async_runtime import async_runner
+from backend.code_cache import CodeCache, compile_blocks, project_cache_dir
+from backend.incremental import compute_fingerprints
+from backend.checkpoints import RUNS_DIR_NAME, start_run, open_run, latest_run, list_runs
+from backend.result_cache import ResultCache, result_key, DEFAULT_MAX_MB, DEFAULT_COMPRESSION
+from backend.shm_transport import TransportRegistry
+from backend.streaming import StreamSource, StreamReader, stream_consumers, wrap_streams, consumer_threads
+from backend.profiling import outputs_size, format_bytes
+from backend.events import default_event_writer, summarize_value, ConsoleEventWriter, RecordingEventWriter
+from backend.graph_file import load_graph, resolve_map_graphs
+from backend.cancellation import RunControl, BlockCancelled, BlockTimeout
+from backend.process_pool import KillableProcessPool
+from backend.preload import graph_modules, worker_context
+from backend.spill import SpillStore, Spilled
+from backend.branches import branch_guards, taken_branches, pruned_by
+from backend.retry import should_retry, retry_delay
+
+# How a failed block is described to the blocks skipped because of it
+FAILURE_WORDS = {"failed": "failed", "timeout": "timed out", "cancelled": "was stopped"}
+
+# How often the scheduler checks deadlines and the stop switch while blocks run
+WATCH_INTERVAL_S = 0.1
+# How long an interrupted thread block gets to notice before it is given up on
+INTERRUPT_GRACE_S = 2.0
+
 # Force UTF-8 encoding for stdout/stderr to allow emoji characters
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
-sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+# (reconfigured in place: under `python -m` this module gets imported a second
+# time, and replacing the wrappers again would close the streams)
+sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+sys.stderr.reconfigure(encoding='utf-8', errors='replace')
 
 def topological_sort(blocks):
-    from collections import defaultdict, deque
-
     id_to_block = {b["id"]: b for b in blocks}
     indegree = defaultdict(int)
     graph = defaultdict(list)
@@ -40,52 +95,861 @@ def topological_sort(blocks):
         print("⚠️ Cycle detected or incomplete graph!")
     return sorted_blocks
 
-def run_all_from_data(path):
-    import sys
-    from types import SimpleNamespace
+def build_dependencies(blocks):
+    """Map each block id to the set of block ids it reads inputs from."""
+    known_ids = {b["id"] for b in blocks}
+    dependencies = {}
+    for b in blocks:
+        sources = set()
+        for mapping in b.get("input_mappings", {}).values():
+            if mapping and mapping.get("block_id") in known_ids:
+                sources.add(mapping["block_id"])
+        dependencies[b["id"]] = sources
+    return dependencies
 
-    with open(path, "r") as f:
-        data = json.load(f)
+def upstream_closure(dependencies, block_ids):
+    """The given blocks plus every block they (transitively) read from."""
+    closure = set()
+    stack = list(block_ids)
+    while stack:
+        bid = stack.pop()
+        if bid in closure:
+            continue
+        closure.add(bid)
+        stack.extend(dependencies.get(bid, ()))
+    return closure
+
+def downstream_closure(dependencies, block_ids):
+    """The given blocks plus every block that (transitively) reads from them."""
+    dependents = defaultdict(set)
+    for bid, sources in dependencies.items():
+        for source_id in sources:
+            dependents[source_id].add(bid)
+    closure = set()
+    stack = list(block_ids)
+    while stack:
+        bid = stack.pop()
+        if bid in closure:
+            continue
+        closure.add(bid)
+        stack.extend(dependents[bid])
+    return closure
+
+def buffered_stream_inputs(consumers, dependencies):
+    """
+    (consumer id, input name) pairs that must buffer a whole stream: their
+    block also depends on another consumer of the same output, so it can't
+    start reading before that one has drained the stream.
+    """
+    buffered = set()
+    downstream = {}
+    for keys in consumers.values():
+        readers = {consumer_id for consumer_id, _ in keys}
+        if len(readers) < 2:
+            continue
+        for reader in readers:
+            if reader not in downstream:
+                downstream[reader] = downstream_closure(dependencies, [reader])
+        for consumer_id, input_name in keys:
+            if any(consumer_id in downstream[other] for other in readers if other != consumer_id):
+                buffered.add((consumer_id, input_name))
+    return buffered
+
+def resolve_inputs(block, variables):
+    inputs = {}
+    for input_name, mapping in block.get("input_mappings", {}).items():
+        source_id = mapping.get("block_id")
+        output_name = mapping.get("output_name")
+
+        source_outputs = variables.get(source_id)
+        if isinstance(source_outputs, SimpleNamespace):
+            inputs[input_name] = getattr(source_outputs, output_name, None)
+        else:
+            inputs[input_name] = None  # or raise an error here if required
+
+        if isinstance(inputs[input_name], StreamSource):
+            inputs[input_name] = inputs[input_name].open_reader((block["id"], input_name))
+        elif isinstance(inputs[input_name], Spilled):
+            inputs[input_name] = inputs[input_name].load()
+    return inputs
+
+def decline_streams(block, variables):
+    """Let streams feeding a finished block stop waiting on inputs it never opened."""
+    for mapping in block.get("input_mappings", {}).values():
+        if not mapping:
+            continue
+        value = getattr(variables.get(mapping.get("block_id")), mapping.get("output_name"), None)
+        if isinstance(value, StreamSource):
+            value.decline(block["id"])
+
+def finished_future(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+def failed_future(exc):
+    future = Future()
+    future.set_exception(exc)
+    return future
+
+def block_timeout(block):
+    """The block's own time limit in seconds, or None."""
+    return float(block.get("timeout_s") or 0) or None
+
+def run_inline(block, inputs, code=None, trace_memory=False, control=None):
+    """Run a block on the calling thread, wrapped in an already-finished Future."""
+    future = Future()
+    try:
+        if control is None:
+            future.set_result(run_block_profiled(block, inputs, code, trace_memory))
+        else:
+            future.set_result(control.track(block["id"], block_timeout(block), run_block_profiled, block, inputs, code, trace_memory))
+    except (Exception, BlockCancelled) as e:
+        future.set_exception(e)
+    return future
+
+def block_target(block, code):
+    """Where a block will actually run: async blocks go to the event loop unless sent to a process."""
+    target = get_execution_target(block)
+    if target != "process" and is_async_block(code):
+        return "async"
+    return target
+
+def cancel_future(future):
+    return future.cancel()
+
+def submit_block(block, inputs, thread_pool, process_pool, code=None, transport=None, trace_memory=False, control=None):
+    """
+    Hand a block to its execution target. Returns a Future for (outputs,
+    profile) and the function that stops it, or None for inline and thread
+    blocks, which RunControl interrupts instead (see watch_running).
+    """
+    try:
+        target = block_target(block, code)
+    except ValueError as e:
+        return failed_future(e), None
 
-    blocks = topological_sort(data["blocks"])
+    if target in ("inline", "thread") and any(isinstance(value, StreamReader) for value in inputs.values()):
+        # Stream consumers mustn't wait for a pool thread, see backend/streaming.py
+        target, thread_pool = "thread", consumer_threads
+    if target == "inline":
+        return run_inline(block, inputs, code, trace_memory, control), None
+    if target == "async":
+        on_start = functools.partial(control.mark_started, block["id"]) if control is not None else None
+        return async_runner.submit(prepare_block, block, inputs, code, on_start=on_start), cancel_future
+    if target == "process":
+        try:
+            # Inputs that won't pickle (lambdas, streams) fail this block, not the run
+            code_bytes = marshal.dumps(code) if code is not None else None
+            future = process_pool.submit(run_block_in_process, block, transport.pack_inputs(block, inputs), code_bytes, trace_memory)
+        except Exception as e:
+            return failed_future(e), None
+        return future, process_pool.kill
+    if control is None:
+        return thread_pool.submit(run_block_profiled, block, inputs, code, trace_memory), None
+    return thread_pool.submit(control.track, block["id"], block_timeout(block), run_block_profiled, block, inputs, code, trace_memory), None
+
+def watch_running(running, control, killers, killed, events):
+    """
+    Enforce block timeouts and the stop switch on blocks still running.
+    Process and async blocks are killed outright through `killers`
+    ({future: stop function}). Thread blocks were already sent an
+    exception by RunControl; one that doesn't react within INTERRUPT_GRACE_S
+    is stuck in native code and is given up on: it is reported as stopped
+    and its thread is left behind (see RunControl.abandoned).
+
+    Timeouts count from when a block starts running (RunControl.started),
+    not from when it was queued: a block still waiting for a pool slot is
+    never timed out, and on stop it is just taken off the queue.
+    """
+    now = time.perf_counter()
+    for future, (block, status, launched) in list(running.items()):
+        if future.done():
+            continue
+        started = control.started.get(block["id"])
+        if started is None and future in killers and future.running():
+            # A process pool worker picked it up
+            started = control.started[block["id"]] = now
+        if started is None:
+            if control.cancelled and future.cancel():
+                killed[future] = control.reason
+            continue
+        timeout = block_timeout(block)
+        expired_at = started + timeout if timeout and now >= started + timeout else None
+        if control.cancelled and (expired_at is None or control.cancelled_at < expired_at):
+            expired_at, reason = control.cancelled_at, control.reason
+        elif expired_at is not None:
+            reason = "timeout"
+        else:
+            continue
+
+        if future in killers:
+            if future not in killed:
+                killed[future] = reason
+                killers[future](future)
+        elif now >= expired_at + INTERRUPT_GRACE_S:
+            control.abandoned.append(block["name"])
+            events.emit("log", level="warning",
+                        message=f"{block['name']} is stuck outside Python code and can't be interrupted; "
+                                f"its thread is left behind.")
+            del running[future]
+            running[failed_future(BlockTimeout() if reason == "timeout" else BlockCancelled())] = (block, status, launched)
+
+def failure_status(e, killed_reason=None):
+    """Status for a block whose future raised `e`: failed, timeout or cancelled."""
+    if killed_reason is not None:
+        return killed_reason  # WorkerDied, or CancelledError if it never left the queue
+    if isinstance(e, BlockTimeout):
+        return "timeout"
+    if isinstance(e, BlockCancelled):
+        return "cancelled"
+    return "failed"
+
+def run_graph(blocks, variables=None, max_workers=None, code_cache=None, last_run=None, changed_only=False,
+              process_pool=None, result_cache=None, overrides=None, events=None, trace_memory=False,
+              always_run=None, control=None, keep=None, spill=None, checkpoint=None):
+    """
+    Run blocks as soon as every block they read from has finished. Each block
+    goes to the target named by its "execution_target" (inline, thread or
+    process). Returns {block_id: outputs SimpleNamespace}.
+
+    With a LastRunStore every successful block is snapshotted under its
+    fingerprint; with changed_only=True blocks whose fingerprint matches the
+    snapshot reuse those outputs instead of running; blocks in `always_run`
+    run regardless. A `checkpoint` (backend/checkpoints.py) takes the
+    snapshots instead, as each block finishes, and records how the run
+    ended, while `last_run` is then only read from.
+
+    Generator outputs are streamed: consumers start right away, each on
+    a thread of its own, and read items through bounded queues while the
+    producer is still running.
+
+    Blocks flagged "cacheable" are also looked up in the ResultCache by the
+    hash of their code and actual input values, across runs and sessions.
+
+    `overrides` ({block_id: {output_name: value}}) is laid over a block's
+    outputs once it finishes; batch mode uses it to bind each record to the
+    start block.
 
+    Progress goes to `events` (see backend/events.py), by default the framed
+    channel the GUI set up or plain console lines. Every block reports a
+    metric event (wall/CPU time, peak traced memory, output size) and a
+    value_summary of its outputs. Peak memory is only measured with
+    trace_memory=True, since tracemalloc slows allocation-heavy Python code
+    down.
+
+    Blocks with a "timeout_s" are stopped once it passes; `control` (a
+    RunControl) adds a whole-run timeout and lets another thread stop the
+    run. Stopped blocks report as "timeout" or "cancelled", and nothing new
+    starts once the run is cancelled.
+
+    A caller that runs many graphs (the warm worker) can pass its own
+    process_pool so worker processes outlive a single run.
+
+    A block's outputs are dropped from `variables` once every block reading
+    them has finished, so only the live frontier of the graph is held in
+    memory. Blocks flagged "pinned" and those in `keep` hold on to theirs
+    until the run ends (and are what the returned dict contains). With a
+    `spill` store (backend/spill.py), large outputs go to disk whenever the
+    live ones add up to more than its budget.
+
+    Blocks on a branch of a conditional block that wasn't taken (see
+    backend/branches.py) are skipped, along with everything downstream.
+    So is everything downstream of a block that failed, while blocks that
+    don't depend on it carry on. Blocks with "retries" are run again when
+    they raise, per their retry policy (backend/retry.py).
+    """
+    if variables is None:
+        variables = {}
+    if code_cache is None:
+        code_cache = CodeCache()
+    if events is None:
+        events = default_event_writer()
+    if control is None:
+        control = RunControl()
+    run_start = time.perf_counter()
+    store = checkpoint if checkpoint is not None else last_run
+    events.emit("run_started", blocks=len(blocks), run_id=checkpoint.run_id if checkpoint is not None else None)
+
+    # === Compile everything first so syntax errors stop the run before it starts ===
+    compiled, syntax_errors = compile_blocks(blocks, code_cache)
+    if syntax_errors:
+        for block, e in syntax_errors:
+            events.emit("block_failed", block_id=block["id"], name=block["name"], index=None,
+                        error=f"line {e.lineno}: {e.msg}", traceback=None, phase="compile")
+        events.emit("log", level="error", message=f"Run aborted: {len(syntax_errors)} block(s) failed to compile.")
+        if checkpoint is not None:
+            checkpoint.write_info(status="aborted", finished_at=time.time())
+        events.emit("run_finished", status="aborted", wall_s=time.perf_counter() - run_start)
+        return variables
+
+    ordered = topological_sort(blocks)
     block_map = {b["id"]: b for b in blocks}
-    variables = {}
+    dependencies = build_dependencies(blocks)
+
+    dependents = defaultdict(list)
+    remaining = {}
+    for bid, sources in dependencies.items():
+        remaining[bid] = len(sources)
+        for source_id in sources:
+            dependents[source_id].append(bid)
+
+    ready = deque(b["id"] for b in ordered if remaining[b["id"]] == 0)
+    running = {}
     counter = 0
 
+    fingerprints = compute_fingerprints(ordered)
+    reused = set()
+    # Blocks whose snapshot matches what actually ran this time. A block is
+    # only snapshotted when all of its sources are, so outputs computed from
+    # a failed upstream never get reused.
+    fresh = set()
+    cache_keys = {}
+    consumers = stream_consumers(blocks)
+    buffered = buffered_stream_inputs(consumers, dependencies)
+    indices = {}
+    failures = 0
+    failed_names = []
+    targets = {}
+    killers = {}  # future -> function that stops it (process and async blocks)
+    killed = {}  # future -> why it was stopped
+    guards = branch_guards(ordered)
+    taken = {}  # conditional block id -> branches it took
+    skipped = {}  # block id -> why it didn't run
+    broken = {}  # failed block id, or one skipped because of it -> what failed upstream
+    attempts = {}  # block id -> retries so far
+    retrying = []  # (due, block id, error) of failed blocks waiting to run again
+    streamed = set()  # blocks reading a stream input, which a retry couldn't replay
+    # === Output lifetimes ===
+    kept = set(keep or ()) | {b["id"] for b in blocks if b.get("pinned")}
+    holders = {bid: len(dependents[bid]) for bid in dependencies}  # consumers that haven't finished yet
+    live_bytes = {}
+    memory = {"live": 0, "peak": 0, "produced": 0, "released": 0}
+
+    # Only pay for worker processes when some block actually asks for them
+    owns_process_pool = False
+    transport = None
+    if any(b.get("execution_target") == "process" for b in blocks):
+        if process_pool is None:
+            context, initializer, initargs = worker_context(
+                graph_modules(b for b in blocks if b.get("execution_target") == "process"))
+            process_pool = KillableProcessPool(max_workers=max_workers, mp_context=context,
+                                               initializer=initializer, initargs=initargs)
+            owns_process_pool = True
+        transport = TransportRegistry({bid: len(dependents[bid]) for bid in dependencies})
+
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        while ready or running or retrying:
+            if control.cancelled:
+                ready.clear()
+                # Blocks waiting for a retry end with the error they last raised
+                for _, bid, error in retrying:
+                    running[failed_future(error)] = (block_map[bid], "ok", time.perf_counter())
+                retrying.clear()
+            now = time.perf_counter()
+            for entry in [entry for entry in retrying if entry[0] <= now]:
+                retrying.remove(entry)
+                ready.append(entry[1])
+
+            # === Launch everything whose sources are done ===
+            while ready:
+                block = block_map[ready.popleft()]
+                if block["id"] not in indices:  # retries keep their number
+                    counter += 1
+                    indices[block["id"]] = counter
+
+                failed_source = next((s for s in dependencies[block["id"]] if s in broken), None)
+                if failed_source is not None:
+                    broken[block["id"]] = broken[failed_source]
+                    skipped[block["id"]] = broken[failed_source]
+                    running[finished_future((None, None))] = (block, "skipped", time.perf_counter())
+                    continue
+
+                pruned = pruned_by(guards[block["id"]], taken)
+                if pruned is not None:
+                    skipped[block["id"]] = f"branch of {block_map[pruned]['name']} not taken"
+                    running[finished_future((None, None))] = (block, "skipped", time.perf_counter())
+                    continue
+
+                if changed_only and last_run is not None and not (always_run and block["id"] in always_run):
+                    previous = last_run.load(block["id"], fingerprints[block["id"]])
+                    if previous is not None:
+                        reused.add(block["id"])
+                        running[finished_future((previous, None))] = (block, "reused", time.perf_counter())
+                        continue
+
+                inputs = resolve_inputs(block, variables)
+                if any(isinstance(value, StreamReader) for value in inputs.values()):
+                    streamed.add(block["id"])
+
+                if block.get("cacheable") and result_cache is not None:
+                    key = result_key(block, inputs)
+                    cached = result_cache.get(key) if key is not None else None
+                    if cached is not None:
+                        running[finished_future((cached, None))] = (block, "cached", time.perf_counter())
+                        continue
+                    cache_keys[block["id"]] = key
+
+                try:
+                    target = block_target(block, compiled[block["id"]])
+                except ValueError:
+                    target = block.get("execution_target")
+                targets[block["id"]] = target
+                events.emit("block_started", block_id=block["id"], name=block["name"], index=indices[block["id"]], target=target)
+                launched = time.perf_counter()
+                control.started.pop(block["id"], None)
+                future, kill = submit_block(block, inputs, pool, process_pool, compiled[block["id"]], transport, trace_memory, control)
+                running[future] = (block, "ok", launched)
+                if kill is not None:
+                    killers[future] = kill
+
+            if not running:
+                if retrying:
+                    time.sleep(min(WATCH_INTERVAL_S, max(0.0, min(entry[0] for entry in retrying) - now)))
+                continue
+            done, _ = wait(running, timeout=WATCH_INTERVAL_S, return_when=FIRST_COMPLETED)
+            watch_running(running, control, killers, killed, events)
+            for future in done:
+                block, status, launched = running.pop(future)
+                snapshot = None
+                killers.pop(future, None)
+                profile = None
+                if status == "skipped":
+                    events.emit("block_skipped", block_id=block["id"], name=block["name"], index=indices[block["id"]],
+                                reason=skipped[block["id"]])
+                    if store is not None:
+                        store.forget(block["id"])
+                        # An untaken branch is what this block's sources called for, so what reads from it can
+                        # still be snapshotted; blocks skipped over a failure run again on resume
+                        if block["id"] not in broken and dependencies[block["id"]] <= fresh:
+                            fresh.add(block["id"])
+                else:
+                    try:
+                        outputs_ns, profile = future.result()
+                        if isinstance(outputs_ns, dict):
+                            # Process blocks send back packed values, see shm_transport
+                            outputs_ns = SimpleNamespace(**transport.adopt_outputs(block["id"], outputs_ns))
+                        if overrides and block["id"] in overrides:
+                            for name, value in overrides[block["id"]].items():
+                                setattr(outputs_ns, name, value)
+                        outputs_ns = wrap_streams(block, outputs_ns, consumers, buffered)
+                        variables[block["id"]] = outputs_ns
+                        if block.get("branches"):
+                            taken[block["id"]] = taken_branches(block, outputs_ns)
+                        size = profile["output_bytes"] if profile and profile.get("output_bytes") is not None else outputs_size(outputs_ns)
+                        live_bytes[block["id"]] = size
+                        memory["live"] += size
+                        memory["produced"] += size
+                        memory["peak"] = max(memory["peak"], memory["live"])
+                        events.emit("block_finished", block_id=block["id"], name=block["name"], index=indices[block["id"]],
+                                    status=status, wall_s=profile["wall_s"] if profile else 0.0)
+                        events.emit("value_summary", block_id=block["id"], name=block["name"],
+                                    outputs={k: summarize_value(v) for k, v in vars(outputs_ns).items()})
+
+                        key = cache_keys.pop(block["id"], None)
+                        if key is not None:
+                            result_cache.put(key, outputs_ns)
+
+                        if store is not None and dependencies[block["id"]] <= fresh:
+                            if block["id"] in reused:
+                                if store is last_run or store.adopt(last_run, block["id"]):
+                                    fresh.add(block["id"])
+                            else:
+                                snapshot = outputs_ns  # saved below, once large outputs may be on disk
+                    except (Exception, BlockCancelled) as e:
+                        status = failure_status(e, killed.pop(future, None))
+                        retry = status == "failed" and not control.cancelled and should_retry(block, e, attempts.get(block["id"], 0))
+                        if retry and block["id"] not in streamed:
+                            attempt = attempts[block["id"]] = attempts.get(block["id"], 0) + 1
+                            delay = retry_delay(block, attempt)
+                            events.emit("block_retry", block_id=block["id"], name=block["name"], index=indices[block["id"]],
+                                        attempt=attempt, retries=int(block.get("retries") or 0), delay_s=delay, error=str(e))
+                            retrying.append((time.perf_counter() + delay, block["id"], e))
+                            continue
+                        if status == "timeout":
+                            timeout = block_timeout(block)
+                            error = f"timed out after {timeout:g}s" if timeout and control.reason != "timeout" else "run timed out"
+                        elif status == "cancelled":
+                            error = "stopped"
+                        else:
+                            error = str(e)
+                            if retry:
+                                error += " (not retried: it read from a stream input, which can't be replayed)"
+                        events.emit("block_failed", block_id=block["id"], name=block["name"], index=indices[block["id"]],
+                                    error=error, traceback="".join(traceback.format_exception(e)) if status == "failed" else None,
+                                    phase="run", reason=status)
+                        if status != "cancelled":
+                            failures += 1
+                        failed_names.append(block["name"])
+                        broken[block["id"]] = f"{block['name']} {FAILURE_WORDS[status]}"
+                        if store is not None:
+                            store.forget(block["id"])
+
+                # Failed blocks have no profile of their own; time them from the scheduler's side
+                record = {
+                    "scope": "block",
+                    "block_id": block["id"],
+                    "name": block["name"],
+                    "status": status,
+                    "target": None if status == "skipped" else targets.get(block["id"]) or block.get("execution_target") or "thread",
+                    "wall_s": time.perf_counter() - control.started.get(block["id"], launched)
+                              if status in ("failed", "timeout", "cancelled") else None,
+                    "cpu_s": None,
+                    "peak_mem_bytes": None,
+                    "output_bytes": None,
+                }
+                record.update(profile or {})
+                events.emit("metric", **record)
+
+                decline_streams(block, variables)
+                if transport is not None:
+                    transport.consumer_finished(dependencies[block["id"]])
+                for source_id in dependencies[block["id"]]:
+                    holders[source_id] -= 1
+                for bid in (*dependencies[block["id"]], block["id"]):
+                    if holders[bid] == 0 and bid not in kept and variables.pop(bid, None) is not None:
+                        memory["live"] -= live_bytes.pop(bid, 0)
+                        memory["released"] += 1
+
+                if spill is not None and memory["live"] > spill.budget:
+                    if not spill.spilled:
+                        events.emit("log", level="info", message=f"Outputs exceed the {format_bytes(spill.budget)} memory "
+                                                                 f"budget, spilling large ones to {spill.directory}")
+                    # Biggest first; outputs living in shared memory can't be freed before their consumers finish
+                    for bid in sorted(live_bytes, key=live_bytes.get, reverse=True):
+                        if memory["live"] <= spill.budget:
+                            break
+                        if transport is not None and transport.owned.get(bid):
+                            continue
+                        freed = spill.spill(bid, variables[bid])
+                        live_bytes[bid] -= freed
+                        memory["live"] -= freed
+
+                # Spilled outputs are checkpointed as links to their files, not pickled again
+                if snapshot is not None and store.save(block["id"], fingerprints[block["id"]], snapshot):
+                    fresh.add(block["id"])
+
+                for child_id in dependents[block["id"]]:
+                    remaining[child_id] -= 1
+                    if remaining[child_id] == 0:
+                        ready.append(child_id)
+    finally:
+        control.close()
+        # A thread that couldn't be interrupted would make a waiting shutdown hang
+        pool.shutdown(wait=not control.abandoned, cancel_futures=True)
+        # Even if the scheduler itself crashed, don't leave segments and worker processes behind
+        if transport is not None:
+            transport.close()
+        if owns_process_pool:
+            process_pool.shutdown()
+
+    if store is not None:
+        store.flush()
+    if result_cache is not None:
+        result_cache.flush()
+        events.emit("metric", scope="result_cache", **result_cache.stats())
+    if spill is not None:
+        for outputs_ns in variables.values():
+            spill.restore(outputs_ns)
+    events.emit("metric", scope="outputs", peak_live_bytes=memory["peak"], produced_bytes=memory["produced"],
+                released=memory["released"], spilled=spill.spilled if spill else 0,
+                spilled_bytes=spill.spilled_bytes if spill else 0)
+
+    if control.reason == "timeout":
+        events.emit("log", level="error", message=f"Run timed out after {control.timeout:g}s and was stopped.")
+    elif control.reason == "cancelled":
+        events.emit("log", level="warning", message="Run stopped.")
+    status = control.reason or ("failed" if failures else "ok")
+    if checkpoint is not None:
+        checkpoint.write_info(status=status, failed=failed_names, finished_at=time.time(),
+                              skipped=[block_map[bid]["name"] for bid in skipped if bid in broken])
+        if status != "ok":
+            events.emit("log", level="info", message=f"Finished blocks were checkpointed as run {checkpoint.run_id}; "
+                                                     "resuming it reruns only what didn't finish.")
+    events.emit("run_finished", status=status, wall_s=time.perf_counter() - run_start)
+    return variables
+
+def graph_cache_dir(data, *parts):
+    """Where a run keeps its caches: an explicit "cache_dir", else the project's .proto_cache."""
+    if data.get("cache_dir"):
+        return Path(data["cache_dir"]) / Path(*parts)
+    if data.get("project_dir"):
+        return project_cache_dir(data["project_dir"], *parts)
+    return None
+
+def open_result_cache(data):
+    """The project's result cache, sized and compressed per the graph's run settings."""
+    directory = graph_cache_dir(data, "results")
+    if directory is None:
+        return None
+    return ResultCache(
+        directory,
+        max_bytes=int((data.get("result_cache_mb") or DEFAULT_MAX_MB) * 1024 * 1024),
+        compression=data.get("result_cache_compression") or DEFAULT_COMPRESSION,
+    )
+
+def run_graph_data(data, max_workers=None, code_cache=None, process_pool=None, result_cache=None, events=None,
+                   control=None):
+    """Run a graph dict as written by the GUI (blocks plus run settings)."""
+    if control is None:
+        control = RunControl()
+    control.set_timeout(data.get("run_timeout_s"))
+    resolve_map_graphs(data["blocks"], data.get("project_dir"))
+    async_runner.set_limit(data.get("async_limit"))
+    if max_workers is None:
+        max_workers = data.get("max_workers")
+
+    if code_cache is None:
+        code_cache = CodeCache(graph_cache_dir(data, "code"))
+
+    # === Checkpoints ===
+    # Each run snapshots its blocks into a run directory of its own; outputs
+    # are reused from the newest earlier run, or from the run being resumed
+    # (which then carries on in the same directory).
+    last_run = checkpoint = None
+    changed_only = data.get("changed_only", False)
+    runs_directory = graph_cache_dir(data, RUNS_DIR_NAME)
+    if data.get("resume"):
+        try:
+            checkpoint = last_run = open_run(runs_directory, data.get("graph_path"), data["resume"])
+        except ValueError as e:
+            # Nothing to resume (no earlier run, or it was pruned): abort like a failed compile
+            events = events or default_event_writer()
+            events.emit("log", level="error", message=f"Run aborted: {e}.")
+            events.emit("run_finished", status="aborted", wall_s=0.0)
+            return {}
+        checkpoint.write_info(status="running", resumed=checkpoint.info.get("resumed", 0) + 1)
+        changed_only = True
+    elif runs_directory is not None:
+        last_run = latest_run(runs_directory, data.get("graph_path"))
+        checkpoint = start_run(runs_directory, data.get("graph_path"))
+    elif changed_only:
+        (events or default_event_writer()).emit("log", level="warning", message="No project directory given, running every block.")
+
+    if result_cache is None:
+        result_cache = open_result_cache(data)
+    else:
+        result_cache.reset_stats()
+
+    # === Pull mode ===
+    # When some blocks are marked as outputs (or picked with "sinks"), only
+    # they and what they transitively read from run; branches feeding none of
+    # them stay on the canvas without costing anything.
+    #
+    # === Partial runs ===
+    # "Run up to here" runs a block and everything it depends on. "Run from
+    # here" runs a block and everything downstream of it; the blocks feeding
+    # that part take their outputs from the last run where the snapshot is
+    # still valid, and run (with their own sources) where it isn't.
+    blocks = data["blocks"]
+    always_run = None
+    sinks = [data["run_up_to"]] if data.get("run_up_to") else graph_sinks(data)
+    if sinks or data.get("run_from"):
+        dependencies = build_dependencies(blocks)
+        selected = upstream_closure(dependencies, sinks) if sinks else set(dependencies)
+        if data.get("run_from"):
+            downstream = downstream_closure(dependencies, [data["run_from"]])
+            # Asking to run from a block no output needs still runs its downstream
+            always_run = (downstream & selected) or downstream
+            selected = upstream_closure(dependencies, always_run)
+            changed_only = True
+        skipped = [b["name"] for b in blocks if b["id"] not in selected]
+        if skipped and not data.get("run_up_to") and not data.get("run_from"):
+            (events or default_event_writer()).emit(
+                "log", level="info",
+                message=f"Skipping {len(skipped)} block(s) no output block depends on: {', '.join(skipped)}",
+            )
+        blocks = [b for b in blocks if b["id"] in selected]
+
+    if checkpoint is not None and last_run is not None and checkpoint is not last_run:
+        # Blocks this run leaves out keep their earlier outputs for the next changed-only run
+        checkpoint.carry_over(last_run, skip={b["id"] for b in blocks})
+
+    spill = None
+    if data.get("memory_budget_mb"):
+        spill = SpillStore(int(data["memory_budget_mb"] * 1024 * 1024), graph_cache_dir(data, "scratch"))
+
+    try:
+        return run_graph(
+            blocks,
+            max_workers=max_workers,
+            code_cache=code_cache,
+            last_run=last_run,
+            changed_only=changed_only,
+            process_pool=process_pool,
+            result_cache=result_cache,
+            events=events,
+            trace_memory=data.get("trace_memory", False),
+            always_run=always_run,
+            control=control,
+            keep=sinks,
+            spill=spill,
+            checkpoint=checkpoint,
+        )
+    finally:
+        if spill is not None:
+            spill.close()
+
+def graph_sinks(data):
+    """Ids of the blocks a run has to produce: picked for this run, else marked as outputs."""
+    if data.get("all_blocks"):
+        return []
+    if data.get("sinks"):
+        return list(data["sinks"])
+    return [b["id"] for b in data["blocks"] if b.get("is_sink")]
+
+def run_all_from_data(path, max_workers=None):
+    with open(path, "r") as f:
+        data = json.load(f)
+    return run_graph_data(data, max_workers=max_workers)
+
+def find_block(blocks, name_or_id):
     for block in blocks:
+        if block["id"] == name_or_id:
+            return block
+    return next((b for b in blocks if b["name"] == name_or_id), None)
+
+def run_command(args):
+    data = load_graph(args.graph)
+    if args.jobs:
+        data["max_workers"] = args.jobs
+    if args.cache_dir:
+        data["cache_dir"] = args.cache_dir
+    data["changed_only"] = args.changed_only
+    for option, key in ((args.run_from, "run_from"), (args.up_to, "run_up_to")):
+        if option:
+            block = find_block(data["blocks"], option)
+            if block is None:
+                print(f"❌ No block named or with id {option!r} in {args.graph}", file=sys.stderr)
+                return 2
+            data[key] = block["id"]
+    if args.sinks:
+        sinks = [find_block(data["blocks"], name) for name in args.sinks]
+        missing = [name for name, block in zip(args.sinks, sinks) if block is None]
+        if missing:
+            print(f"❌ No block named or with id {missing[0]!r} in {args.graph}", file=sys.stderr)
+            return 2
+        data["sinks"] = [block["id"] for block in sinks]
+    data["all_blocks"] = args.all_blocks
+
+    report_fd = None
+    if args.output == "json":
+        # stdout is reserved for the report; everything else, including
+        # prints from blocks and their worker processes, goes to stderr
+        sys.stdout.flush()
+        report_fd = os.dup(1)
+        os.dup2(2, 1)
+
+    if args.timeout is not None:
+        data["run_timeout_s"] = args.timeout
+    if args.async_limit:
+        data["async_limit"] = args.async_limit
+    if args.resume:
         try:
-            counter += 1
-            print(f"\n🔹 [{counter}] Running: {block['name']}")
+            open_run(graph_cache_dir(data, RUNS_DIR_NAME), data.get("graph_path"), args.resume)
+        except ValueError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 2
+        data["resume"] = args.resume
+    if args.memory_budget is not None:
+        data["memory_budget_mb"] = args.memory_budget
+    if args.trace_memory:
+        data["trace_memory"] = True
 
-            inputs = {}
-            for input_name, mapping in block.get("input_mappings", {}).items():
-                source_id = mapping.get("block_id")
-                output_name = mapping.get("output_name")
+    events = RecordingEventWriter(ConsoleEventWriter())
+    control = RunControl()
+    run_graph_data(data, events=events, control=control)
 
-                source_outputs = variables.get(source_id)
-                if isinstance(source_outputs, SimpleNamespace):
-                    inputs[input_name] = getattr(source_outputs, output_name, None)
-                else:
-                    inputs[input_name] = None  # or raise an error here if required
+    if report_fd is not None:
+        sys.stdout.flush()
+        with os.fdopen(report_fd, "w", encoding="utf-8") as report:
+            json.dump(events.report(), report, indent=2, default=repr)
+            report.write("\n")
+    exit_code = 1 if events.failed else 0
+    if control.abandoned:
+        # Stuck block threads would keep the interpreter from exiting
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(exit_code)
+    return exit_code
 
-            local_vars = {
-                "inputs": SimpleNamespace(**inputs),
-                "outputs": SimpleNamespace()
-            }
+def compile_command(args):
+    # Imported here: the compiler builds on this module's graph helpers
+    from backend.graph_compiler import compile_graph_file, GraphCompileError
+    data = load_graph(args.graph)
+    if args.cache_dir:
+        data["cache_dir"] = args.cache_dir
+    try:
+        path, rebuilt = compile_graph_file(data, args.output_path)
+    except GraphCompileError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    print(f"📦 {'Compiled' if rebuilt else 'Up to date'}: {path}")
+    return 0
 
-            exec(block["code"], {}, local_vars)
+def runs_command(args):
+    data = load_graph(args.graph)
+    if args.cache_dir:
+        data["cache_dir"] = args.cache_dir
+    runs = list_runs(graph_cache_dir(data, RUNS_DIR_NAME), data.get("graph_path"))
+    if not runs:
+        print("ℹ️ No runs recorded for this graph.")
+    for info in runs:
+        started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(info.get("started_at") or 0))
+        failed = f"  failed: {', '.join(info['failed'])}" if info.get("failed") else ""
+        print(f"{info['run_id']}  {started}  {info.get('status', '?'):<9}{failed}".rstrip())
+    return 0
 
-            outputs_ns = local_vars["outputs"]
-            if not isinstance(outputs_ns, SimpleNamespace):
-                raise ValueError("outputs must be a SimpleNamespace")
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0].endswith(".json"):
+        # Older form: python backend/block_executor.py exported_graph.json
+        run_all_from_data(argv[0])
+        return 0
 
-            variables[block["id"]] = outputs_ns
-            if counter == 2:
-                print(f"✅ [{block['name']}] finished with outputs: {vars(outputs_ns)}")
+    parser = argparse.ArgumentParser(prog="python -m backend.block_executor", description="Run block graphs without the GUI.")
+    commands = parser.add_subparsers(dest="command", required=True)
 
-        except Exception as e:
-            print(f"❌ [{block['name']}] error: {e}", file=sys.stderr)
+    run = commands.add_parser("run", help="run a .quark graph")
+    run.add_argument("graph", help=".quark file (or a graph exported by the GUI)")
+    run.add_argument("--jobs", type=int, default=None, help="blocks run at once (default: project setting, else CPU count)")
+    run.add_argument("--cache-dir", default=None, help="cache directory (default: <project>/.proto_cache)")
+    run.add_argument("--async-limit", type=int, default=None, help="async blocks in flight at once (default: 32)")
+    run.add_argument("--memory-budget", type=float, default=None, metavar="MB",
+                     help="spill large outputs to disk once the live ones exceed this (default: project setting, 0 for none)")
+    run.add_argument("--trace-memory", action="store_true",
+                     help="measure each block's peak memory with tracemalloc (slower; default: project setting)")
+    run.add_argument("--timeout", type=float, default=None, help="stop the run after this many seconds")
+    run.add_argument("--changed-only", action="store_true", help="reuse outputs of blocks unchanged since the last run")
+    scope = run.add_mutually_exclusive_group()
+    scope.add_argument("--from", dest="run_from", metavar="BLOCK", help="run only this block (name or id) and what depends on it")
+    scope.add_argument("--up-to", metavar="BLOCK", help="run only this block (name or id) and what it depends on")
+    scope.add_argument("--resume", metavar="RUN_ID",
+                       help="continue an earlier run (\"last\" for the newest): reuse its checkpoints, rerun what didn't finish")
+    wanted = run.add_mutually_exclusive_group()
+    wanted.add_argument("--sink", dest="sinks", action="append", metavar="BLOCK",
+                         help="compute only this block (name or id) and what it needs; repeatable "
+                              "(default: the blocks marked as outputs, if any)")
+    wanted.add_argument("--all", dest="all_blocks", action="store_true",
+                         help="run every block, ignoring the output marks")
+    run.add_argument("--output", choices=("text", "json"), default="text", help="json prints a run report on stdout")
+    run.set_defaults(handler=run_command)
+
+    runs = commands.add_parser("runs", help="list the checkpointed runs of a .quark graph, newest first")
+    runs.add_argument("graph", help=".quark file (or a graph exported by the GUI)")
+    runs.add_argument("--cache-dir", default=None, help="cache directory (default: <project>/.proto_cache)")
+    runs.set_defaults(handler=runs_command)
+
+    compile_parser = commands.add_parser("compile", help="turn a .quark graph into one importable Python module")
+    compile_parser.add_argument("graph", help=".quark file (or a graph exported by the GUI)")
+    compile_parser.add_argument("-o", dest="output_path", default=None,
+                                help="module to write (default: <project>/.proto_cache/compiled/<graph>.py)")
+    compile_parser.add_argument("--cache-dir", default=None, help="cache directory (default: <project>/.proto_cache)")
+    compile_parser.set_defaults(handler=compile_command)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
 
 if __name__ == "__main__":
-    run_all_from_data(sys.argv[1])
+    sys.exit(main())
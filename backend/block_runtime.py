@@ -0,0 +1,96 @@
+import marshal
+import asyncio
+import inspect
+from types import SimpleNamespace, CodeType
+
+from backend.shm_transport import pack, unpack, close_segment, WORKERS_CAN_EXPORT
+from backend.profiling import profile_call, outputs_size
+from backend.block_state import defines_setup, block_state
+
+# Where a block's code runs:
+#   inline  - directly on the executor's scheduler thread (needed by GUI calls like cv2.imshow)
+#   thread  - on the shared thread pool (default, good for I/O and numpy/cv2 code that drops the GIL)
+#   process - on a worker process pool (pure-Python CPU-bound code)
+EXECUTION_TARGETS = ("inline", "thread", "process")
+DEFAULT_EXECUTION_TARGET = "thread"
+
+
+def get_execution_target(block):
+    target = block.get("execution_target") or DEFAULT_EXECUTION_TARGET
+    if target not in EXECUTION_TARGETS:
+        raise ValueError(f"Unknown execution target {target!r} (expected one of {', '.join(EXECUTION_TARGETS)})")
+    return target
+
+
+def is_async_block(code):
+    """Whether a compiled block body defines `async def run(inputs, outputs)` at top level."""
+    return isinstance(code, CodeType) and any(
+        isinstance(const, CodeType) and const.co_name == "run" and const.co_flags & inspect.CO_COROUTINE
+        for const in code.co_consts
+    )
+
+
+def prepare_block(block, inputs, code=None):
+    """Exec a block body and return its namespace (inputs, outputs and whatever it defined)."""
+    # One namespace for globals and locals: with separate dicts, functions and
+    # generators defined in the block can't see the block's own imports.
+    namespace = {
+        "inputs": SimpleNamespace(**inputs),
+        "outputs": SimpleNamespace()
+    }
+    code = code if code is not None else block["code"]
+    if defines_setup(code):
+        namespace["state"] = block_state(block)  # see backend/block_state.py
+    exec(code, namespace)
+    return namespace
+
+
+def execute_block(block, inputs, code=None):
+    """Run a block body. `code` is its precompiled code object, if there is one."""
+    if block.get("block_type") == "map":
+        from backend.map_block import run_map_block
+        return run_map_block(block, inputs)
+
+    namespace = prepare_block(block, inputs, code)
+    if inspect.iscoroutinefunction(namespace.get("run")):
+        # Async blocks normally run on the shared event loop (see async_runtime);
+        # off it, e.g. on a worker process, they get a loop of their own
+        asyncio.run(namespace["run"](namespace["inputs"], namespace["outputs"]))
+
+    outputs_ns = namespace["outputs"]
+    if not isinstance(outputs_ns, SimpleNamespace):
+        raise ValueError("outputs must be a SimpleNamespace")
+    return outputs_ns
+
+
+def run_block_profiled(block, inputs, code=None, trace_memory=False):
+    """execute_block plus timing/memory figures. Returns (outputs, profile)."""
+    outputs_ns, profile = profile_call(execute_block, block, inputs, code, trace_memory=trace_memory)
+    profile["output_bytes"] = outputs_size(outputs_ns)
+    return outputs_ns, profile
+
+
+def run_block_in_process(block, packed_inputs, code_bytes=None, trace_memory=False):
+    """
+    Entry point for process-targeted blocks. Inputs arrive and outputs leave
+    as {name: Packed} dicts (see shm_transport), so large buffers travel as
+    shared memory segment names rather than through the pool's pipe. Code
+    objects don't pickle, so the compiled body comes over as marshal bytes.
+    Returns (packed outputs, profile), the profile being measured in the worker.
+    """
+    code = marshal.loads(code_bytes) if code_bytes is not None else None
+    attached = {}
+    try:
+        inputs = {name: unpack(packed, attached) for name, packed in packed_inputs.items()}
+        outputs_ns, profile = run_block_profiled(block, inputs, code, trace_memory)
+        del inputs
+
+        created = []
+        packed_outputs = {name: pack(value, created, use_shm=WORKERS_CAN_EXPORT) for name, value in vars(outputs_ns).items()}
+        # The executor unlinks these once every consumer has run
+        for shm in created:
+            close_segment(shm)
+        return packed_outputs, profile
+    finally:
+        for shm in attached.values():
+            close_segment(shm)
@@ -0,0 +1,124 @@
+# block_state.py
+#
+# A block that loads a model, opens a device or parses a big table can do it
+# once per worker instead of on every run by defining setup():
+#
+#   import torch
+#
+#   def setup():
+#       return torch.load("model.pt")
+#
+#   def teardown():
+#       state.close()   # optional; `state` is what setup() returned
+#
+#   outputs.y = state(inputs.x)
+#
+# setup() runs in whichever process executes the block (the executor, a
+# process-pool worker, a batch worker) the first time it runs there; what it
+# returns is kept in that process, keyed by the block and the hash of its
+# code, and is `state` in the block body from then on. setup() only sees the
+# block's top-level imports, functions, classes and literal constants, since
+# the rest of the body needs `state` to run. teardown() is called when the
+# block's code changes and when the process exits normally.
+
+import os
+import sys
+import ast
+import threading
+import multiprocessing.util
+from types import CodeType
+
+from backend.code_cache import code_hash, block_filename
+
+_lock = threading.Lock()
+_states = {}  # block id -> BlockState
+_setup_locks = {}  # block id -> Lock, so concurrent runs of a block set up once
+_finalizer_pid = None
+
+
+class BlockState:
+    __slots__ = ("code_hash", "value", "namespace", "pid")
+
+    def __init__(self, code_hash, value, namespace):
+        self.code_hash = code_hash
+        self.value = value
+        self.namespace = namespace
+        self.pid = os.getpid()
+
+
+def defines_setup(code):
+    """Whether a block body (source or compiled) defines setup() at top level."""
+    if isinstance(code, CodeType):
+        return any(isinstance(const, CodeType) and const.co_name == "setup" for const in code.co_consts)
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return False
+    return any(isinstance(node, ast.FunctionDef) and node.name == "setup" for node in tree.body)
+
+
+def is_definition(node):
+    if isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return True
+    if isinstance(node, (ast.Assign, ast.AnnAssign)) and node.value is not None:
+        try:
+            ast.literal_eval(node.value)
+            return True
+        except ValueError:
+            return False
+    return False
+
+
+def setup_module(source):
+    """The part of a block body setup() can rely on: top-level imports, defs and literal constants."""
+    tree = ast.parse(source)
+    tree.body = [node for node in tree.body if is_definition(node)]
+    return tree
+
+
+def teardown(entry):
+    hook = entry.namespace.get("teardown")
+    if not callable(hook) or entry.pid != os.getpid():
+        return  # inherited through fork: the parent owns it
+    try:
+        hook()
+    except Exception as e:
+        print(f"⚠️ teardown() failed: {type(e).__name__}: {e}", file=sys.stderr)
+
+
+def block_state(block):
+    """setup()'s value for a block, calling it first if this process has none for the block's current code."""
+    global _finalizer_pid
+    block_id = block["id"]
+    source = block.get("code", "")
+    key = code_hash(source)
+    with _lock:
+        lock = _setup_locks.setdefault(block_id, threading.Lock())
+    with lock:
+        entry = _states.get(block_id)
+        if entry is not None and entry.code_hash == key and entry.pid == os.getpid():
+            return entry.value
+        if entry is not None:
+            del _states[block_id]
+            teardown(entry)
+
+        namespace = {}
+        exec(compile(setup_module(source), block_filename(block), "exec"), namespace)
+        value = namespace["setup"]()
+        namespace["state"] = value  # for teardown()
+        with _lock:
+            _states[block_id] = BlockState(key, value, namespace)
+            if _finalizer_pid != os.getpid():
+                # Runs at interpreter exit, and in multiprocessing workers when they stop
+                multiprocessing.util.Finalize(None, teardown_all, exitpriority=10)
+                _finalizer_pid = os.getpid()
+        return value
+
+
+def teardown_all():
+    """Call every block's teardown() and forget all state."""
+    with _lock:
+        entries = list(_states.values())
+        _states.clear()
+    for entry in entries:
+        teardown(entry)
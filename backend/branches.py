@@ -0,0 +1,46 @@
+# branches.py
+#
+# A conditional block can name some of its outputs as branches ("branches":
+# ["small", "large"]): outputs it only sets on the path it takes (the
+# conditional editor starts each if/elif/else arm with
+# `outputs.<branch> = True`). A block reading a branch output sits on that
+# branch, and so does everything downstream of it; when the branch isn't
+# taken the executor skips that whole sub-graph instead of running it on
+# None inputs. A block reading several branches of the same conditional,
+# where they join back up, runs if any of them was taken and gets None for
+# the others.
+
+
+def branch_guards(ordered):
+    """
+    {block id: {conditional id: branch names}} for blocks in topological
+    order: a block runs only if, for every conditional it depends on, one of
+    the listed branches was taken.
+    """
+    block_map = {b["id"]: b for b in ordered}
+    guards = {}
+    for block in ordered:
+        needs = {}
+        for mapping in block.get("input_mappings", {}).values():
+            source_id = (mapping or {}).get("block_id")
+            if source_id not in guards:
+                continue
+            for conditional_id, branches in guards[source_id].items():
+                needs.setdefault(conditional_id, set()).update(branches)
+            if mapping.get("output_name") in block_map[source_id].get("branches", ()):
+                needs.setdefault(source_id, set()).add(mapping["output_name"])
+        guards[block["id"]] = needs
+    return guards
+
+
+def taken_branches(block, outputs_ns):
+    """The branch outputs a finished conditional block actually set."""
+    return {name for name in block.get("branches", ()) if hasattr(outputs_ns, name)}
+
+
+def pruned_by(guards, taken):
+    """The conditional whose untaken branches rule a block out, or None if it runs."""
+    for conditional_id, branches in guards.items():
+        if not branches & taken.get(conditional_id, set()):
+            return conditional_id
+    return None
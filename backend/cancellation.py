@@ -0,0 +1,112 @@
+import ctypes
+import threading
+import time
+
+
+class BlockCancelled(BaseException):
+    """
+    Raised inside a block's code when its run is stopped. A BaseException so
+    that a block's own `except Exception:` doesn't swallow it.
+    """
+
+
+class BlockTimeout(BlockCancelled):
+    pass
+
+
+def interrupt_thread(thread_id, exc_type):
+    """
+    Raise exc_type in another thread the next time it runs Python bytecode.
+    Code stuck inside a C call (cv2.waitKey(0), a blocking socket read) only
+    sees it once that call returns. exc_type=None clears a pending one.
+    """
+    exc = ctypes.py_object(exc_type) if exc_type is not None else None
+    return ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(thread_id), exc) == 1
+
+
+class RunControl:
+    """
+    Stop switch and deadlines for one run. Inline and thread blocks execute
+    under track(), so cancel() and their timers can interrupt the thread
+    they run on; process blocks are killed by the scheduler instead.
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = None
+        self.reason = None
+        self.cancelled_at = None
+        self.abandoned = []  # names of blocks left running on a thread that couldn't be interrupted
+        self.started = {}  # block_id -> perf_counter() when its current attempt began running
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._active = {}  # block_id -> [thread id, exception sent to it or None]
+        self._run_timer = None
+        self.set_timeout(timeout)
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def set_timeout(self, timeout):
+        """Whole-run timeout in seconds from now; None or 0 for no limit."""
+        self.close()
+        self.timeout = timeout or None
+        if self.timeout:
+            # A timer rather than a check in the scheduler, which is busy while an inline block runs
+            self._run_timer = threading.Timer(self.timeout, self.cancel, ("timeout",))
+            self._run_timer.daemon = True
+            self._run_timer.start()
+
+    def close(self):
+        if self._run_timer is not None:
+            self._run_timer.cancel()
+            self._run_timer = None
+
+    def cancel(self, reason="cancelled"):
+        with self._lock:
+            if self.reason is None:
+                self.reason = reason
+                self.cancelled_at = time.perf_counter()
+            self._cancelled.set()
+            for block_id in list(self._active):
+                self._interrupt(block_id, BlockTimeout if reason == "timeout" else BlockCancelled)
+
+    def interrupt(self, block_id, exc_type):
+        with self._lock:
+            return self._interrupt(block_id, exc_type)
+
+    def _interrupt(self, block_id, exc_type):
+        entry = self._active.get(block_id)
+        if entry is None or entry[1] is not None:
+            return False
+        entry[1] = exc_type
+        return interrupt_thread(entry[0], exc_type)
+
+    def mark_started(self, block_id):
+        """Note that a block left its queue; its timeout counts from here."""
+        self.started[block_id] = time.perf_counter()
+
+    def track(self, block_id, timeout, fn, *args):
+        """Call fn(*args) on this thread so it can be interrupted; BlockTimeout after `timeout` seconds."""
+        if self.cancelled:
+            raise BlockCancelled()
+        self.mark_started(block_id)
+        with self._lock:
+            self._active[block_id] = entry = [threading.get_ident(), None]
+        timer = None
+        if timeout:
+            timer = threading.Timer(timeout, self.interrupt, (block_id, BlockTimeout))
+            timer.daemon = True
+            timer.start()
+        try:
+            return fn(*args)
+        finally:
+            if timer is not None:
+                timer.cancel()
+            with self._lock:
+                del self._active[block_id]
+                sent = entry[1]
+            if sent is not None:
+                # The exception may still be pending if fn returned first; drop it and raise our own
+                interrupt_thread(entry[0], None)
+                raise sent()
@@ -0,0 +1,114 @@
+# checkpoints.py
+#
+# Every run gets a directory under <project>/.proto_cache/runs/<run id>
+# where each block's outputs are pickled as soon as it finishes, plus
+# run.json saying which graph it was and how it ended. Resuming a run loads
+# those checkpoints and executes only what they don't cover: the blocks that
+# failed or never ran, and everything downstream of them. The newest run of
+# a graph is also what "Run Changed Only" reuses outputs from.
+
+import json
+import os
+import time
+import shutil
+import secrets
+from pathlib import Path
+
+from backend.incremental import LastRunStore, graph_key
+
+RUNS_DIR_NAME = "runs"
+# Runs kept per graph; older ones are deleted when a new run starts
+KEEP_RUNS = 5
+
+
+class RunCheckpoint(LastRunStore):
+    """
+    A LastRunStore for one run that writes its manifest after every block,
+    so a run that is killed outright can still be resumed.
+    """
+
+    def __init__(self, directory, info=None):
+        super().__init__(directory)
+        self.info_path = self.directory / "run.json"
+        if info is None:
+            with open(self.info_path, "r") as f:
+                info = json.load(f)
+        self.info = info
+
+    @property
+    def run_id(self):
+        return self.info["run_id"]
+
+    def save(self, block_id, fingerprint, outputs_ns):
+        saved = super().save(block_id, fingerprint, outputs_ns)
+        self.flush()
+        return saved
+
+    def adopt(self, other, block_id):
+        adopted = super().adopt(other, block_id)
+        self.flush()
+        return adopted
+
+    def carry_over(self, other, skip=()):
+        """Adopt every snapshot of `other` for blocks outside `skip` (blocks this run doesn't execute)."""
+        for block_id in list(other.manifest):
+            if block_id not in skip:
+                super().adopt(other, block_id)
+        self.flush()
+
+    def write_info(self, **fields):
+        self.info.update(fields)
+        tmp = self.info_path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.info, f, indent=2)
+        os.replace(tmp, self.info_path)
+
+
+def list_runs(directory, graph_path):
+    """run.json contents of a graph's runs under `directory`, newest first."""
+    if directory is None or not Path(directory).is_dir():
+        return []
+    key = graph_key(graph_path)
+    runs = []
+    for info_path in Path(directory).glob("*/run.json"):
+        try:
+            with open(info_path, "r") as f:
+                info = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if info.get("graph_key") == key:
+            runs.append(info)
+    return sorted(runs, key=lambda info: info.get("started_at") or 0, reverse=True)
+
+
+def open_run(directory, graph_path, run_id):
+    """The checkpoints of an earlier run of a graph; run_id "last" means the newest."""
+    if run_id == "last":
+        runs = list_runs(directory, graph_path)
+        if not runs:
+            raise ValueError("This graph has no earlier run to resume")
+        run_id = runs[0]["run_id"]
+    if directory is None or Path(run_id).name != run_id or not (Path(directory) / run_id / "run.json").is_file():
+        raise ValueError(f"No run {run_id!r} to resume")
+    return RunCheckpoint(Path(directory) / run_id)
+
+
+def latest_run(directory, graph_path):
+    runs = list_runs(directory, graph_path)
+    return RunCheckpoint(Path(directory) / runs[0]["run_id"]) if runs else None
+
+
+def start_run(directory, graph_path):
+    """A fresh checkpoint directory for a new run of a graph, pruning its oldest runs."""
+    for info in list_runs(directory, graph_path)[KEEP_RUNS - 1:]:
+        shutil.rmtree(Path(directory) / info["run_id"], ignore_errors=True)
+    run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(2)}"
+    checkpoint = RunCheckpoint(Path(directory) / run_id, info={
+        "run_id": run_id,
+        "graph_path": graph_path,
+        "graph_key": graph_key(graph_path),
+        "started_at": time.time(),
+        "status": "running",
+    })
+    checkpoint.write_info()
+    return checkpoint
@@ -0,0 +1,77 @@
+import hashlib
+import marshal
+import os
+import sys
+from pathlib import Path
+
+# Everything the executor keeps on disk lives under <project>/.proto_cache
+CACHE_DIR_NAME = ".proto_cache"
+
+
+def project_cache_dir(project_dir, *parts):
+    return Path(project_dir) / CACHE_DIR_NAME / Path(*parts)
+
+
+def code_hash(source):
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+class CodeCache:
+    """
+    Compiled block bodies, stored as marshal files keyed by the hash of the
+    source and the interpreter's cache tag (marshal output is only valid for
+    the exact interpreter version that wrote it). With no cache_dir the cache
+    still memoizes in memory for the life of the process.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._memory = {}
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def key(self, source, filename):
+        tag = sys.implementation.cache_tag or sys.version
+        return code_hash(f"{tag}\0{filename}\0{source}")
+
+    def compile(self, source, filename="<block>"):
+        key = self.key(source, filename)
+        code = self._memory.get(key)
+        if code is not None:
+            return code
+
+        path = self.cache_dir / f"{key}.marshal" if self.cache_dir is not None else None
+        if path is not None and path.exists():
+            try:
+                code = marshal.loads(path.read_bytes())
+            except (EOFError, ValueError, TypeError):
+                code = None  # corrupt or foreign entry, just rebuild it
+
+        if code is None:
+            code = compile(source, filename, "exec")  # SyntaxError propagates to the caller
+            if path is not None:
+                tmp = path.with_suffix(f".{os.getpid()}.tmp")
+                tmp.write_bytes(marshal.dumps(code))
+                os.replace(tmp, path)
+
+        self._memory[key] = code
+        return code
+
+
+def block_filename(block):
+    return f"<block {block.get('name', block['id'])}>"
+
+
+def compile_blocks(blocks, cache):
+    """
+    Compile every block up front. Returns ({block_id: code}, [(block, SyntaxError)])
+    so syntax errors can be reported before anything runs.
+    """
+    compiled = {}
+    errors = []
+    for block in blocks:
+        try:
+            compiled[block["id"]] = cache.compile(block.get("code", ""), block_filename(block))
+        except SyntaxError as e:
+            errors.append((block, e))
+    return compiled, errors
@@ -2,66 +2,263 @@ import subprocess
 import tempfile
 import json
 import sys
-from PyQt6.QtCore import QThread, pyqtSignal
-
-def run_all_blocks(window, canvas):
-    import subprocess, tempfile, json, sys
-    from PyQt6.QtCore import QThread, pyqtSignal
-
-    class StreamReaderThread(QThread):
-        line_received = pyqtSignal(str)
-        error_received = pyqtSignal(str)
-        finished = pyqtSignal()
-
-        def __init__(self, process):
-            super().__init__()
-            self.process = process
-
-        def run(self):
-            while True:
-                if self.process.stdout:
-                    line = self.process.stdout.readline()
-                    if line:
-                        self.line_received.emit(line)
-                if self.process.stderr:
-                    err = self.process.stderr.readline()
-                    if err:
-                        self.error_received.emit("❌ " + err)
-                if self.process.poll() is not None:
-                    break
-            self.finished.emit()
-
-    # === Extract block data ===
+import os
+import atexit
+from pathlib import Path
+from PyQt6.QtCore import QThread, QTimer, pyqtSignal
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from backend.events import EventRenderer, read_frames, EVENT_FD_ENV, EVENT_HANDLE_ENV
+from backend.graph_file import block_settings
+
+WORKER_SCRIPT = Path(__file__).resolve().parent / "worker.py"
+EXECUTOR_SCRIPT = Path(__file__).resolve().parent / "block_executor.py"
+# How long Stop waits for the worker to wind a run down before killing it
+STOP_KILL_AFTER_MS = 5000
+
+
+class StreamReaderThread(QThread):
+    """Pumps the worker's stdout (block prints, tracebacks) into the GUI for as long as the worker lives."""
+    line_received = pyqtSignal(str)
+    worker_exited = pyqtSignal(int)
+
+    def __init__(self, process):
+        super().__init__()
+        self.process = process
+
+    def run(self):
+        for line in self.process.stdout:
+            self.line_received.emit(line)
+        self.worker_exited.emit(self.process.wait())
+
+
+class EventReaderThread(QThread):
+    """Reads framed events from the worker's event pipe, see backend/events.py."""
+    event_received = pyqtSignal(dict)
+
+    def __init__(self, read_fd):
+        super().__init__()
+        self.read_fd = read_fd
+
+    def run(self):
+        with os.fdopen(self.read_fd, "rb") as stream:
+            for event in read_frames(stream):
+                self.event_received.emit(event)
+
+
+def event_pipe_kwargs(write_fd):
+    """Popen arguments that let the worker inherit the write end of the event pipe and nothing else."""
+    env = dict(os.environ)
+    if sys.platform == "win32":
+        import msvcrt
+        handle = msvcrt.get_osfhandle(write_fd)
+        os.set_handle_inheritable(handle, True)
+        env[EVENT_HANDLE_ENV] = str(handle)
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.lpAttributeList = {"handle_list": [handle]}
+        return {"env": env, "startupinfo": startupinfo}
+    env[EVENT_FD_ENV] = str(write_fd)
+    return {"env": env, "pass_fds": (write_fd,)}
+
+
+class ExecutorWorker:
+    """
+    A warm `backend/worker.py` process running in the project's interpreter.
+    Graphs are submitted over its stdin; if it dies it is restarted on the
+    next submit.
+    """
+
+    def __init__(self, python_path):
+        self.python_path = python_path
+        self.process = None
+        self.reader = None
+        self.event_reader = None
+        self.renderer = EventRenderer()
+        self.busy = False
+        self.runs_submitted = 0
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def ensure_started(self, window):
+        if self.is_alive():
+            return
+        if self.process is not None:
+            window.append_output("♻️ Restarting executor worker...\n")
+
+        # Progress events get their own pipe so block prints can't interleave with them
+        read_fd, write_fd = os.pipe()
+        try:
+            self.process = subprocess.Popen(
+                [self.python_path, "-u", str(WORKER_SCRIPT)],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+                **event_pipe_kwargs(write_fd)
+            )
+        except Exception:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)  # the worker holds the only write end now, so EOF means it exited
+        self.busy = False
+
+        # === Store threads on the worker so they're not garbage collected ===
+        self.reader = StreamReaderThread(self.process)
+        self.reader.line_received.connect(window.append_output)
+        self.reader.worker_exited.connect(lambda code: self._on_exit(window, code))
+        self.reader.start()
+
+        self.event_reader = EventReaderThread(read_fd)
+        self.event_reader.event_received.connect(lambda event: self._on_event(window, event))
+        self.event_reader.start()
+
+    def submit(self, window, graph_path):
+        self.ensure_started(window)
+        self.busy = True
+        self.runs_submitted += 1
+        self.process.stdin.write(json.dumps({"cmd": "run", "graph": graph_path}) + "\n")
+        self.process.stdin.flush()
+
+    def cancel(self, window):
+        """Ask the worker to stop the current run; kill it if it hasn't within STOP_KILL_AFTER_MS."""
+        if not (self.busy and self.is_alive()):
+            return
+        window.append_output("⛔ Stopping run...\n")
+        self.process.stdin.write(json.dumps({"cmd": "cancel"}) + "\n")
+        self.process.stdin.flush()
+        run = self.runs_submitted
+        QTimer.singleShot(STOP_KILL_AFTER_MS, lambda: self._kill_if_still_running(window, run))
+
+    def _kill_if_still_running(self, window, run):
+        if self.busy and self.runs_submitted == run and self.is_alive():
+            window.append_output("💀 The run didn't stop in time, killing the executor worker.\n")
+            self.busy = False
+            self.process.kill()
+
+    def shutdown(self):
+        if not self.is_alive():
+            return
+        try:
+            self.process.stdin.write(json.dumps({"cmd": "shutdown"}) + "\n")
+            self.process.stdin.flush()
+            self.process.wait(timeout=5)
+        except Exception:
+            self.process.kill()
+
+    def _on_event(self, window, event):
+        text = self.renderer.render(event)
+        if text is not None:
+            window.append_output(text + "\n")
+        window.handle_executor_event(event)
+        if event.get("event") == "run_finished":
+            self.busy = False
+            if event.get("status") == "ok":
+                window.append_output("✅ All blocks completed.\n")
+            elif event.get("status") in ("cancelled", "timeout"):
+                pass  # the executor already said why
+            else:
+                window.append_output("⚠️ Run finished with errors.\n")
+
+    def _on_exit(self, window, code):
+        if self.busy:
+            window.append_output(f"💥 Executor worker exited with code {code} mid-run, it will restart on the next run.\n")
+        self.busy = False
+
+
+_workers = {}  # (project base path, interpreter) -> ExecutorWorker
+
+
+def project_python(project):
+    python_path = str(getattr(project, "python_path", "") or "")
+    if python_path and Path(python_path).exists():
+        return python_path
+    return sys.executable
+
+
+def get_worker(project):
+    python_path = project_python(project)
+    key = (str(project.base_path), python_path)
+    if key not in _workers:
+        _workers[key] = ExecutorWorker(python_path)
+    return _workers[key]
+
+
+@atexit.register
+def shutdown_workers():
+    for worker in _workers.values():
+        worker.shutdown()
+    _workers.clear()
+
+
+def stop_run(window):
+    worker = _workers.get((str(window.controller.project.base_path), project_python(window.controller.project)))
+    if worker is None or not worker.busy:
+        window.append_output("ℹ️ Nothing is running.\n")
+        return
+    worker.cancel(window)
+
+
+def export_blocks(canvas):
+    """The canvas's blocks as the executor reads them (see backend/graph_file.py)."""
     block_data = []
     for block in canvas.blocks:
-        block_data.append({
-            "id": block.id,
-            "name": block.name,
-            "code": block.code,
-            "input_mappings": getattr(block, "input_mappings", {}),
-            "outputs": getattr(block.outputs, "__dict__", {}),
-            "is_start_block": getattr(block, "is_start_block", False),
-        })
-
-    # === Write to temp file ===
+        block_data.append({**block_settings(block), "outputs": getattr(block.outputs, "__dict__", {})})
+    return block_data
+
+
+def run_all_blocks(window, canvas, changed_only=False, run_from=None, run_up_to=None, all_blocks=False, resume=None):
+    project = window.controller.project
+    worker = get_worker(project)
+    if worker.busy and worker.is_alive():
+        window.append_output("⏳ A run is already in progress.\n")
+        return
+
+    block_data = export_blocks(canvas)
+
+    # === Write to temp file (the worker deletes it once loaded) ===
     with tempfile.NamedTemporaryFile(delete=False, suffix=".json", mode="w") as temp:
-        json.dump({"blocks": block_data}, temp)
+        json.dump({
+            "blocks": block_data,
+            "max_workers": getattr(project, "max_workers", None),
+            "async_limit": getattr(project, "async_limit", None),
+            "memory_budget_mb": getattr(project, "memory_budget_mb", 0),
+            "trace_memory": getattr(project, "trace_memory", False),
+            "project_dir": str(project.base_path),
+            "graph_path": canvas.filepath,
+            "changed_only": changed_only,
+            "run_from": run_from,
+            "run_up_to": run_up_to,
+            "all_blocks": all_blocks,
+            "resume": resume,
+            "run_timeout_s": getattr(canvas, "run_timeout_s", 0),
+            "result_cache_mb": getattr(project, "result_cache_mb", None),
+            "result_cache_compression": getattr(project, "result_cache_compression", None),
+        }, temp)
         temp_path = temp.name
 
-    # === Run subprocess with unbuffered mode ===
-    process = subprocess.Popen(
-        [sys.executable, "-u", "backend/block_executor.py", temp_path],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        encoding="utf-8",
-        errors="replace"
-    )
-
-    # === Store thread as attribute so it's not garbage collected ===
-    window.block_runner_thread = StreamReaderThread(process)
-    t = window.block_runner_thread
-    t.line_received.connect(window.append_output)
-    t.error_received.connect(window.append_output)
-    t.finished.connect(lambda: window.append_output("✅ All blocks completed.\n"))
-    t.start()
+    worker.submit(window, temp_path)
+
+
+def compile_canvas(window, canvas):
+    """Write the canvas's graph out as one Python module (backend/graph_compiler.py) under the project cache."""
+    project = window.controller.project
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".json", mode="w") as temp:
+        json.dump({
+            "blocks": export_blocks(canvas),
+            "project_dir": str(project.base_path),
+            "graph_path": canvas.filepath,
+        }, temp)
+        temp_path = temp.name
+    try:
+        # In the project's interpreter, like runs, so the module matches the Python that will import it
+        result = subprocess.run(
+            [project_python(project), str(EXECUTOR_SCRIPT), "compile", temp_path],
+            capture_output=True, text=True, encoding="utf-8", errors="replace",
+        )
+    finally:
+        os.unlink(temp_path)
+    window.append_output(result.stdout + result.stderr)
@@ -0,0 +1,300 @@
+# events.py
+#
+# Control messages from the executor (progress, failures, metrics, value
+# summaries) travel as events, separate from whatever blocks print. When the
+# GUI starts a worker it hands it the write end of a pipe, and each event is
+# sent there as one frame: a 4-byte big-endian length followed by a JSON
+# object with an "event" key. Without a pipe (CLI, piped runs) events are
+# rendered as the usual emoji lines on stdout/stderr instead.
+#
+# Event kinds:
+#   run_started     {blocks, run_id}
+#   block_started   {block_id, name, index, target}
+#   block_finished  {block_id, name, index, status, wall_s}
+#   block_failed    {block_id, name, index, error, traceback, phase, reason: failed/timeout/cancelled}
+#   block_skipped   {block_id, name, index, reason}
+#   block_retry     {block_id, name, index, attempt, retries, delay_s, error}
+#   log             {level, message}
+#   metric          {scope: "block", block_id, name, status, target, wall_s, cpu_s, peak_mem_bytes, output_bytes}
+#                   {scope: "result_cache", hits, misses, entries, bytes}
+#                   {scope: "outputs", peak_live_bytes, produced_bytes, released, spilled, spilled_bytes}
+#   value_summary   {block_id, name, outputs: {name: {type, shape, dtype, len, repr}}}
+#   run_finished    {status: ok/failed/aborted/timeout/cancelled/error, wall_s}
+
+import os
+import sys
+import json
+import struct
+import reprlib
+import threading
+
+from backend.profiling import format_profile_table, format_bytes
+
+EVENT_FD_ENV = "PROTO_EVENT_FD"
+EVENT_HANDLE_ENV = "PROTO_EVENT_HANDLE"  # Windows: inherited OS handle instead of an fd
+
+_HEADER = struct.Struct(">I")
+
+
+class _SummaryRepr(reprlib.Repr):
+    """
+    reprlib still calls the full repr() on bytes-like values, which for a
+    large buffer costs seconds and several times its size in memory. These
+    only repr their first bytes, plus the length.
+    """
+
+    head = 64
+
+    def _buffer(self, value, wrap):
+        text = wrap(repr(bytes(value[:self.head])))
+        if len(text) > self.maxstring or len(value) > self.head:
+            text = text[:self.maxstring - 3] + "..."
+        return f"{text} ({len(value)} bytes)"
+
+    def repr_bytes(self, value, level):
+        return self._buffer(value, str)
+
+    def repr_bytearray(self, value, level):
+        return self._buffer(value, lambda text: f"bytearray({text})")
+
+    def repr_memoryview(self, value, level):
+        return f"<memoryview format={value.format!r} shape={list(value.shape or ())} ({value.nbytes} bytes)>"
+
+
+_repr = _SummaryRepr()
+_repr.maxstring = 80
+_repr.maxother = 80
+
+
+def encode_frame(event):
+    payload = json.dumps(event, default=str).encode("utf-8")
+    return _HEADER.pack(len(payload)) + payload
+
+
+def read_frames(stream):
+    """Yield events from a binary stream of frames until EOF."""
+    while True:
+        header = stream.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            return
+        (length,) = _HEADER.unpack(header)
+        payload = stream.read(length)
+        if len(payload) < length:
+            return
+        yield json.loads(payload.decode("utf-8"))
+
+
+def summarize_value(value):
+    summary = {"type": type(value).__name__}
+    shape = getattr(value, "shape", None)
+    if isinstance(shape, tuple):
+        summary["shape"] = list(shape)
+    dtype = getattr(value, "dtype", None)
+    if dtype is not None:
+        summary["dtype"] = str(dtype)
+    if shape is None and hasattr(value, "__len__"):
+        try:
+            summary["len"] = len(value)
+        except Exception:
+            pass
+    summary["repr"] = _repr.repr(value)
+    return summary
+
+
+class EventRenderer:
+    """
+    Turns events into terminal text. Both the console writer and the
+    designer use it, so a run reads the same in either place. Keeps the
+    block metrics of the current run for the closing profile table.
+    """
+
+    def __init__(self):
+        self.profiles = []
+        self.cache_stats = None
+        self.output_stats = None
+        self.failures = []  # (name, error) of blocks that failed, timed out or were stopped
+        self.skips = []  # (name, reason) of blocks that didn't run
+
+    def render(self, event):
+        kind = event.get("event")
+        if kind == "run_started":
+            self.profiles = []
+            self.cache_stats = None
+            self.output_stats = None
+            self.failures = []
+            self.skips = []
+            return None
+        if kind == "block_started":
+            return f"\n🔹 [{event['index']}] Running: {event['name']}"
+        if kind == "block_finished":
+            if event["status"] == "reused":
+                return f"\n⏩ [{event['index']}] Unchanged, reusing: {event['name']}"
+            if event["status"] == "cached":
+                return f"\n💾 [{event['index']}] Cached result: {event['name']}"
+            return f"✅ [{event['name']}] finished in {event['wall_s']:.3f}s"
+        if kind == "block_failed":
+            self.failures.append((event["name"], event["error"]))
+            if event.get("phase") == "compile":
+                return f"❌ [{event['name']}] syntax error on {event['error']}"
+            if event.get("reason") == "timeout":
+                return f"⏱️ [{event['name']}] {event['error']}"
+            if event.get("reason") == "cancelled":
+                return f"⛔ [{event['name']}] {event['error']}"
+            return f"❌ [{event['name']}] error: {event['error']}"
+        if kind == "block_retry":
+            return (f"🔁 [{event['name']}] failed (attempt {event['attempt']} of {event['retries'] + 1}): "
+                    f"{event['error']}, retrying in {event['delay_s']:g}s")
+        if kind == "block_skipped":
+            self.skips.append((event["name"], event["reason"]))
+            return f"\n⏭️ [{event['index']}] Skipped: {event['name']} ({event['reason']})"
+        if kind == "log":
+            icon = {"warning": "⚠️", "error": "🛑"}.get(event.get("level"), "ℹ️")
+            return f"{icon} {event['message']}"
+        if kind == "metric":
+            if event.get("scope") == "block":
+                self.profiles.append(event)
+            elif event.get("scope") == "result_cache":
+                self.cache_stats = event
+            elif event.get("scope") == "outputs":
+                self.output_stats = event
+            return None
+        if kind == "run_finished":
+            parts = []
+            if self.profiles:
+                parts.append("\n📊 Block profile (slowest first)\n" + format_profile_table(self.profiles, event.get("wall_s") or 0))
+            stats = self.cache_stats
+            if stats and (stats["hits"] or stats["misses"]):
+                parts.append(f"\n🗄️ Result cache: {stats['hits']} hit(s), {stats['misses']} miss(es), "
+                             f"{stats['entries']} entries / {stats['bytes'] / (1024 * 1024):.1f} MB")
+            stats = self.output_stats
+            if stats and stats["produced_bytes"]:
+                line = (f"🧹 Block outputs: {format_bytes(stats['peak_live_bytes'])} held at most, "
+                        f"{format_bytes(stats['produced_bytes'])} produced")
+                if stats.get("spilled"):
+                    line += f", {stats['spilled']} spilled to disk ({format_bytes(stats['spilled_bytes'])})"
+                parts.append(line)
+            if self.failures or self.skips:
+                parts.append(f"\n🧾 {len(self.failures)} block(s) failed, {len(self.skips)} skipped")
+                for name, error in self.failures:
+                    parts.append(f"   ❌ {name}: {error.splitlines()[0] if error else ''}")
+                for name, reason in self.skips:
+                    parts.append(f"   ⏭️ {name}: {reason}")
+            return "\n".join(parts) or None
+        return None
+
+
+def is_error_event(event):
+    return event.get("event") == "block_failed" or (event.get("event") == "log" and event.get("level") == "error")
+
+
+class ConsoleEventWriter:
+    """Renders events as text; quiet=True keeps only failures and errors (batch runs)."""
+
+    def __init__(self, quiet=False):
+        self.quiet = quiet
+        self.renderer = EventRenderer()
+        self._lock = threading.Lock()
+
+    def emit(self, kind, **fields):
+        event = {"event": kind, **fields}
+        error = is_error_event(event)
+        if self.quiet and not error:
+            return
+        with self._lock:
+            text = self.renderer.render(event)
+            if text is not None:
+                print(text, file=sys.stderr if error else sys.stdout, flush=True)
+
+
+class RecordingEventWriter:
+    """
+    Passes events on to another writer (if any) and keeps a per-block record
+    of the run, for the CLI's JSON report and exit code.
+    """
+
+    def __init__(self, inner=None):
+        self.inner = inner
+        self.blocks = {}
+        self.logs = []
+        self.status = None
+        self.wall_s = None
+        self.outputs = None
+        self.run_id = None
+        self._lock = threading.Lock()
+
+    def emit(self, kind, **fields):
+        with self._lock:
+            self._record(kind, fields)
+        if self.inner is not None:
+            self.inner.emit(kind, **fields)
+
+    def _record(self, kind, fields):
+        if kind == "run_started":
+            self.blocks, self.logs, self.status, self.wall_s, self.outputs = {}, [], None, None, None
+            self.run_id = fields.get("run_id")
+        elif kind == "run_finished":
+            self.status, self.wall_s = fields.get("status"), fields.get("wall_s")
+        elif kind == "log":
+            self.logs.append(fields)
+        elif kind == "metric" and fields.get("scope") == "outputs":
+            self.outputs = {k: v for k, v in fields.items() if k != "scope"}
+        elif kind in ("block_started", "block_finished", "block_failed", "block_skipped", "block_retry", "value_summary") or (
+                kind == "metric" and fields.get("scope") == "block"):
+            record = self.blocks.setdefault(fields["block_id"], {"block_id": fields["block_id"], "name": fields["name"]})
+            if kind == "block_failed":
+                record.update(status=fields.get("reason", "failed"), error=fields["error"], traceback=fields.get("traceback"))
+            elif kind == "block_skipped":
+                record.update(status="skipped", reason=fields["reason"])
+            elif kind == "block_retry":
+                record["retries"] = fields["attempt"]
+            elif kind == "value_summary":
+                record["outputs"] = fields["outputs"]
+            elif kind == "metric":
+                record.update({k: v for k, v in fields.items() if k not in ("scope", "block_id", "name")})
+            elif kind == "block_finished":
+                record["status"] = fields["status"]
+
+    @property
+    def failed(self):
+        return self.status != "ok"
+
+    def report(self):
+        return {"run_id": self.run_id, "status": self.status, "wall_s": self.wall_s, "blocks": list(self.blocks.values()), "logs": self.logs,
+                "outputs": self.outputs}
+
+
+class FramedEventWriter:
+    def __init__(self, fd):
+        self._stream = os.fdopen(fd, "wb", buffering=0)
+        self._lock = threading.Lock()
+
+    def emit(self, kind, **fields):
+        frame = encode_frame({"event": kind, **fields})
+        # Push out pending block output first so the GUI sees it before the event
+        sys.stdout.flush()
+        with self._lock:
+            try:
+                self._stream.write(frame)
+            except (BrokenPipeError, OSError):
+                pass  # nobody is listening any more; the run itself carries on
+
+
+def _inherited_event_fd():
+    if os.environ.get(EVENT_FD_ENV):
+        return int(os.environ[EVENT_FD_ENV])
+    if os.environ.get(EVENT_HANDLE_ENV) and sys.platform == "win32":
+        import msvcrt
+        return msvcrt.open_osfhandle(int(os.environ[EVENT_HANDLE_ENV]), os.O_WRONLY)
+    return None
+
+
+_default_writer = None
+
+
+def default_event_writer():
+    """The framed channel if the parent set one up, otherwise console output. One per process."""
+    global _default_writer
+    if _default_writer is None:
+        fd = _inherited_event_fd()
+        _default_writer = FramedEventWriter(fd) if fd is not None else ConsoleEventWriter()
+    return _default_writer
@@ -0,0 +1,19 @@
+# forkserver_template.py
+#
+# Imported once by the multiprocessing forkserver (see backend/preload.py),
+# never by the executor itself: pulls in the modules the graph's process
+# blocks use, then freezes the garbage collector so the objects they created
+# stay untouched, and shared copy-on-write, in every worker forked from here.
+
+import gc
+import os
+import importlib
+
+for _name in filter(None, os.environ.get("PROTO_PRELOAD_MODULES", "").split(",")):  # preload.PRELOAD_ENV
+    try:
+        importlib.import_module(_name)
+    except Exception:
+        pass  # the block importing it reports the error when it runs
+
+gc.collect()
+gc.freeze()
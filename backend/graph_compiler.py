@@ -0,0 +1,422 @@
+# graph_compiler.py
+#
+# Turns a graph into one plain Python module: each block becomes a function
+# and run() calls them in topological order, handing outputs to inputs as
+# local variables. Graphs made of many tiny blocks (the Logic gate library)
+# spend most of their time in the executor's per-block exec, namespaces and
+# lookups; the fused module skips all of that.
+#
+#   python -m backend.block_executor compile project/pipeline.quark -o pipeline.py
+#   python pipeline.py            # or: import pipeline; pipeline.run()
+#
+# Where a block only touches `inputs.x` / `outputs.y` directly, those become
+# local names. Blocks doing anything else with inputs/outputs keep real
+# namespaces, and blocks relying on module-level exec semantics (global,
+# star imports, locals()) are exec'd as before. The generated module needs
+# only the standard library. It runs everything inline on one thread:
+# execution targets, timeouts, the result cache and incremental runs are
+# executor features and don't apply. A block's setup() runs on its first
+# call, and its teardown() when the interpreter exits. Blocks on a branch a
+# conditional block didn't take are skipped, as in the executor.
+
+import ast
+import json
+import hashlib
+import keyword
+from collections import defaultdict
+from pathlib import Path
+
+from backend.code_cache import code_hash, block_filename
+from backend.block_state import defines_setup, setup_module
+from backend.branches import branch_guards
+from backend.graph_file import block_definition
+from backend.block_executor import topological_sort, build_dependencies, upstream_closure, graph_sinks, graph_cache_dir
+
+# Bump when the generated code changes shape, so cached modules get rebuilt
+COMPILER_VERSION = 3
+
+# Builtins a block can only use at module level of its own exec namespace
+EXEC_ONLY_NAMES = {"globals", "locals", "exec", "eval"}
+
+
+# Module-level helper for blocks defining setup() (see backend/block_state.py)
+STATE_HELPER = '''_quark_states = {}
+
+
+def _quark_state(name, setup_code):
+    """What a block's setup() returned, calling it the first time."""
+    if name not in _quark_states:
+        namespace = {}
+        exec(setup_code, namespace)
+        namespace["state"] = _quark_states[name] = namespace["setup"]()
+        if callable(namespace.get("teardown")):
+            _quark_atexit.register(namespace["teardown"])
+    return _quark_states[name]'''
+
+
+class GraphCompileError(ValueError):
+    """The graph can't be turned into a module (syntax error, cycle, unsupported block)."""
+
+
+# === Block analysis ===
+
+def uses_exec_semantics(tree):
+    """Whether a block body only behaves right as a module body (exec), not as a function body."""
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Global, ast.Nonlocal)):
+            return True
+        if isinstance(node, ast.ImportFrom) and any(alias.name == "*" for alias in node.names):
+            return True
+        if isinstance(node, ast.Name) and node.id in EXEC_ONLY_NAMES:
+            return True
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                and node.func.id in ("vars", "dir") and not node.args):
+            return True
+    return False
+
+
+def direct_io(tree):
+    """
+    The (inputs read, outputs used) of a block that only ever uses
+    `inputs.x` and `outputs.y` as plain attribute accesses, with outputs
+    untouched inside nested functions and classes; None for any other use.
+    """
+    read, touched = set(), set()
+    direct = set()  # ids of the Name nodes accounted for
+    nested_outputs = False
+
+    def visit(node, nested):
+        nonlocal nested_outputs
+        if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+            name = node.value.id
+            if name == "inputs" and isinstance(node.ctx, ast.Load):
+                read.add(node.attr)
+                direct.add(id(node.value))
+            elif name == "outputs" and isinstance(node.ctx, (ast.Load, ast.Store)):
+                touched.add(node.attr)
+                direct.add(id(node.value))
+                nested_outputs = nested_outputs or nested
+        nested = nested or isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef))
+        for child in ast.iter_child_nodes(node):
+            visit(child, nested)
+
+    visit(tree, False)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node.id in ("inputs", "outputs") and id(node) not in direct:
+            return None
+        if isinstance(node, ast.arg) and node.arg in ("inputs", "outputs"):
+            return None
+    if nested_outputs:
+        return None
+    return read, touched
+
+
+def defines_async_run(tree):
+    return any(isinstance(node, ast.AsyncFunctionDef) and node.name == "run" for node in tree.body)
+
+
+def names_in(tree):
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            names.add(node.id)
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.alias):
+            names.add((node.asname or node.name).split(".")[0])
+    return names
+
+
+def local_name(prefix, name, taken):
+    """A fresh identifier for an input or output, readable where the name allows it."""
+    base = f"{prefix}_{name}" if name.isidentifier() and not keyword.iskeyword(name) else f"{prefix}_{len(taken)}"
+    candidate = base
+    while candidate in taken:
+        candidate += "_"
+    taken.add(candidate)
+    return candidate
+
+
+class DirectIO(ast.NodeTransformer):
+    """Rewrites inputs.x / outputs.y into the local names picked for them."""
+
+    def __init__(self, input_names, output_names):
+        self.input_names = input_names
+        self.output_names = output_names
+
+    def visit_Attribute(self, node):
+        if isinstance(node.value, ast.Name):
+            names = {"inputs": self.input_names, "outputs": self.output_names}.get(node.value.id)
+            if names is not None:
+                return ast.copy_location(ast.Name(id=names[node.attr], ctx=node.ctx), node)
+        return self.generic_visit(node)
+
+
+# === Code generation ===
+
+def namespace_expr(args):
+    """Source building a SimpleNamespace from {name: local variable}."""
+    if all(name.isidentifier() and not keyword.iskeyword(name) for name in args):
+        return "_quark_Namespace(" + ", ".join(f"{name}={var}" for name, var in args.items()) + ")"
+    return "_quark_Namespace(**{" + ", ".join(f"{name!r}: {var}" for name, var in args.items()) + "})"
+
+
+def returned(values):
+    return f"return ({', '.join(values)}{',' if len(values) == 1 else ''})"
+
+
+def block_function(block, function_name, wanted, uses):
+    """
+    Source of the function standing for one block: takes the block's wired
+    inputs positionally (sorted by name) and returns the `wanted` outputs as
+    a tuple. `uses` collects the module-level helpers the function needs.
+    """
+    if block.get("block_type") == "map":
+        raise GraphCompileError(f"Map block '{block['name']}' can't be compiled; it runs its sub-graph on the executor's process pool")
+
+    code = block.get("code", "")
+    try:
+        tree = ast.parse(code, filename=block_filename(block))
+    except SyntaxError as e:
+        raise GraphCompileError(f"Block '{block['name']}': syntax error on line {e.lineno}: {e.msg}") from None
+
+    taken = names_in(tree) | {"inputs", "outputs"}
+    params = {name: local_name("inputs", name, taken) for name in sorted(block.get("input_mappings", {}))}
+    exec_only = uses_exec_semantics(tree)
+    io = None if exec_only or defines_async_run(tree) else direct_io(tree)
+    if io is not None and not io[0] <= set(params):
+        io = None  # reads an input nothing is wired to; let the namespace raise, as in the executor
+    # Branch outputs the block doesn't set come back as _quark_UNSET, see backend/branches.py
+    branches = set(block.get("branches") or ()) & set(wanted)
+    if branches:
+        uses.add("unset")
+    unset = {name: "_quark_UNSET" if name in branches else "None" for name in wanted}
+
+    state = None
+    if defines_setup(code):
+        uses.add("state")
+        setup_constant = f"_{function_name.upper()}_SETUP"
+        uses.add((setup_constant, ast.unparse(setup_module(code)), block_filename(block)))
+        state = f"_quark_state({function_name!r}, {setup_constant})"
+
+    if io is not None:
+        # Fast path: inputs arrive as arguments and outputs are plain locals
+        read, touched = io
+        outputs = {name: local_name("outputs", name, taken) for name in sorted(touched | set(wanted))}
+        prologue = [f"{var} = {unset.get(name, 'None')}" for name, var in outputs.items()]
+        body = DirectIO(params, outputs).visit(tree).body
+        epilogue = [returned([outputs[name] for name in wanted])]
+    elif exec_only:
+        # Relies on running as a module body: exec it in its own namespace, like the executor does
+        uses.add("namespace")
+        constant = f"_{function_name.upper()}_CODE"
+        uses.add((constant, code, block_filename(block)))
+        prologue = [
+            f"namespace = {{'inputs': {namespace_expr(params)}, 'outputs': _quark_Namespace()"
+            + (f", 'state': {state}" if state else "") + "}",
+            f"exec({constant}, namespace)",
+            "outputs = namespace['outputs']",
+        ]
+        body = []
+        epilogue = [returned([f"getattr(outputs, {name!r}, {unset[name]})" for name in wanted])]
+    else:
+        uses.add("namespace")
+        prologue = [f"inputs = {namespace_expr(params)}", "outputs = _quark_Namespace()"]
+        body = tree.body
+        epilogue = []
+        if defines_async_run(tree):
+            uses.add("asyncio")
+            epilogue.append("_quark_asyncio.run(run(inputs, outputs))")
+        epilogue.append(returned([f"getattr(outputs, {name!r}, {unset[name]})" for name in wanted]))
+
+    if state and not exec_only:
+        prologue.append(f"state = {state}")
+
+    function = ast.parse(f"def {function_name}({', '.join(params.values())}):\n    pass").body[0]
+    function.body = (
+        [ast.Expr(ast.Constant(f"{block['name']} ({block['id']})"))]
+        + ast.parse("\n".join(prologue)).body
+        + body
+        + ast.parse("\n".join(epilogue)).body
+    )
+    return ast.unparse(ast.fix_missing_locations(function))
+
+
+def graph_hash(blocks, result_ids):
+    payload = json.dumps({
+        "compiler": COMPILER_VERSION,
+        "results": sorted(result_ids),
+        "blocks": [
+            [b["id"], b["name"], b.get("block_type", "code"), code_hash(block_definition(b)),
+             b.get("input_mappings", {}), sorted(b.get("outputs") or {}), b.get("branches") or []]
+            for b in blocks
+        ],
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def compile_graph(data, source_name="graph"):
+    """
+    Generate the module for a graph dict (as load_graph returns). Only the
+    output blocks and what they need are compiled when any are marked (see
+    block_executor.graph_sinks); run() returns the outputs of those, or of
+    the blocks nothing reads from, keyed by block name. Result blocks that
+    share a name are keyed "name#1", "name#2", ... in the order they run, so
+    none of them overwrites another.
+    """
+    blocks = data["blocks"]
+    dependencies = build_dependencies(blocks)
+    sinks = graph_sinks(data)
+    if sinks:
+        needed = upstream_closure(dependencies, sinks)
+        blocks = [b for b in blocks if b["id"] in needed]
+        dependencies = {bid: sources for bid, sources in dependencies.items() if bid in needed}
+
+    ordered = topological_sort(blocks)
+    if len(ordered) != len(blocks):
+        raise GraphCompileError("The graph has a cycle")
+
+    read_from = set().union(*dependencies.values()) if dependencies else set()
+    result_ids = set(sinks) if sinks else {b["id"] for b in blocks if b["id"] not in read_from}
+
+    # Which outputs of each block someone needs, in a fixed order
+    wanted = {b["id"]: set() for b in ordered}
+    for block in ordered:
+        for mapping in block.get("input_mappings", {}).values():
+            if mapping and mapping.get("block_id") in wanted:
+                wanted[mapping["block_id"]].add(mapping.get("output_name"))
+    for block in ordered:
+        if block["id"] in result_ids:
+            wanted[block["id"]] |= set(block.get("outputs") or {})
+            wanted[block["id"]] |= assigned_outputs(block)
+    wanted = {bid: sorted(names) for bid, names in wanted.items()}
+
+    # Keys of run()'s result dict: block names, numbered where several result blocks share one
+    result_names = [b["name"] for b in ordered if b["id"] in result_ids]
+    seen = defaultdict(int)
+    result_keys = {}
+    for block in ordered:
+        if block["id"] in result_ids:
+            name = block["name"]
+            if result_names.count(name) > 1:
+                seen[name] += 1
+                name = f"{name}#{seen[name]}"
+            result_keys[block["id"]] = name
+
+    uses = set()
+    functions = []
+    variables = {}  # (block id, output name) -> local variable in run()
+    maybe_unset = set()  # variables holding branch outputs, _quark_UNSET when not taken
+    guards = branch_guards(ordered)
+    calls = []
+    results = []
+
+    def value(var):
+        return f"(None if {var} is _quark_UNSET else {var})" if var in maybe_unset else var
+
+    for index, block in enumerate(ordered, start=1):
+        function_name = f"block_{index}"
+        functions.append(block_function(block, function_name, wanted[block["id"]], uses))
+
+        args = []
+        for name in sorted(block.get("input_mappings", {})):
+            mapping = block["input_mappings"][name] or {}
+            args.append(value(variables.get((mapping.get("block_id"), mapping.get("output_name")), "None")))
+        outputs = [f"b{index}_{name}" if name.isidentifier() else f"b{index}_{position}"
+                   for position, name in enumerate(wanted[block["id"]])]
+        variables.update({(block["id"], name): var for name, var in zip(wanted[block["id"]], outputs)})
+        maybe_unset.update(var for name, var in zip(wanted[block["id"]], outputs) if name in (block.get("branches") or ()))
+        call = f"{function_name}({', '.join(args)})"
+        call = f"({', '.join(outputs)},) = {call}" if outputs else call
+        if guards[block["id"]]:
+            # Only run when, for each conditional it hangs off, one of its branches was taken
+            taken = [" or ".join(f"{variables[(conditional_id, branch)]} is not _quark_UNSET" for branch in sorted(branches))
+                     for conditional_id, branches in sorted(guards[block["id"]].items())]
+            condition = " and ".join(f"({t})" if " or " in t and len(taken) > 1 else t for t in taken)
+            call = f"if {condition}:\n    {call}"
+            if outputs:
+                skipped = " = ".join(var for var in outputs if var not in maybe_unset)
+                call += "\nelse:"
+                if skipped:
+                    call += f"\n    {skipped} = None"
+                if maybe_unset & set(outputs):
+                    call += f"\n    {' = '.join(var for var in outputs if var in maybe_unset)} = _quark_UNSET"
+        calls.append(call)
+        if block["id"] in result_ids:
+            fields = ", ".join(f"{name!r}: {value(var)}" for name, var in zip(wanted[block["id"]], outputs))
+            results.append(f"{result_keys[block['id']]!r}: {{{fields}}}")
+
+    header = [f"# Generated from {source_name} by backend/graph_compiler.py. Don't edit; recompile instead."]
+    if "namespace" in uses:
+        header.append("from types import SimpleNamespace as _quark_Namespace")
+    if "asyncio" in uses:
+        header.append("import asyncio as _quark_asyncio")
+    if "state" in uses:
+        header.append("import atexit as _quark_atexit")
+        functions.insert(0, STATE_HELPER)
+    header += ["", f'GRAPH_HASH = "{graph_hash(ordered, result_ids)}"']
+    if "unset" in uses:
+        header.append("_quark_UNSET = object()  # a branch output its conditional block didn't set")
+    for constant, code, filename in sorted(u for u in uses if isinstance(u, tuple)):
+        header.append(f"{constant} = compile({code!r}, {filename!r}, 'exec')")
+
+    run = [
+        "def run():",
+        '    """Run the graph once. Returns the outputs of its result blocks, by block name (name#n where names repeat)."""',
+        *(f"    {line}" for call in calls for line in call.split("\n")),
+        "    return {" + ", ".join(results) + "}",
+    ]
+    main = [
+        'if __name__ == "__main__":',
+        "    import pprint",
+        "    pprint.pprint(run())",
+    ]
+    return "\n".join(header) + "\n\n" + "\n\n\n".join(functions) + "\n\n" + "\n".join(run) + "\n\n\n" + "\n".join(main) + "\n"
+
+
+def assigned_outputs(block):
+    """Output names a block assigns as outputs.<name>, as far as can be seen statically."""
+    try:
+        tree = ast.parse(block.get("code", ""))
+    except SyntaxError:
+        return set()
+    return {
+        node.attr for node in ast.walk(tree)
+        if isinstance(node, ast.Attribute) and isinstance(node.ctx, ast.Store)
+        and isinstance(node.value, ast.Name) and node.value.id == "outputs"
+    }
+
+
+# === Cache ===
+
+def compiled_path(data):
+    """Where the module of a graph is kept: <project>/.proto_cache/compiled/<graph name>.py."""
+    stem = Path(data.get("graph_path") or "untitled").stem
+    stem = "".join(c if c.isalnum() else "_" for c in stem)
+    if not stem or stem[0].isdigit():
+        stem = f"graph_{stem}"
+    directory = graph_cache_dir(data, "compiled")
+    return directory / f"{stem}.py" if directory is not None else None
+
+
+def compile_graph_file(data, path=None):
+    """
+    Write the graph's module to `path` (default: compiled_path) unless the
+    one there was generated from the same graph. Returns (path, rebuilt).
+    """
+    path = Path(path) if path else compiled_path(data)
+    if path is None:
+        raise GraphCompileError("No project directory given; pass an output path")
+    source = compile_graph(data, Path(data.get("graph_path") or "untitled").name)
+    try:
+        if path.read_text(encoding="utf-8") == source:
+            return path, False
+    except OSError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(source, encoding="utf-8")
+    tmp.replace(path)
+    return path, True
@@ -0,0 +1,144 @@
+# graph_file.py
+#
+# Reads saved graphs without the GUI. A .quark file holds everything the
+# canvas needs (positions, colours, connections); the executor only wants the
+# fields below, so blocks are trimmed down to those and missing ones filled in
+# with the same defaults a fresh Block gets. Nothing here may import PyQt6.
+#
+# EXECUTOR_FIELDS is also the one list of per-block settings: a new Block
+# starts from it, and exporting, saving and loading blocks (and block
+# templates) go through block_settings() / apply_block_settings(), so a new
+# field only has to be added here.
+
+import copy
+import json
+from pathlib import Path
+
+PROJECT_FILE_NAME = "project_settings.json"  # see backend/project.py
+
+# Block fields the executor reads, with the defaults a new Block gets
+EXECUTOR_FIELDS = {
+    "id": None,
+    "name": "Unnamed Block",
+    "block_type": "code",
+    "code": "",
+    "input_mappings": {},
+    "outputs": {},
+    "is_start_block": False,
+    "is_sink": False,  # output block: when any are marked, runs compute only what they need
+    "pinned": False,  # keep outputs until the run ends instead of freeing them after the last consumer
+    "execution_target": "thread",  # inline / thread / process, see backend/block_runtime.py
+    "requirements": [],
+    "cacheable": False,  # keep outputs in the project result cache across runs
+    "stream_buffer": 8,  # queue size between this block's generator outputs and their consumers
+    "timeout_s": 0,  # seconds before the executor stops this block, 0 for no limit
+    # Retry policy for blocks that fail now and then, see backend/retry.py
+    "retries": 0,
+    "retry_backoff_s": 1.0,
+    "retry_on": [],
+    # Conditional blocks: outputs only set on the branch taken (backend/branches.py)
+    "branches": [],
+    # Map blocks (backend/map_block.py)
+    "map_graph": None,
+    "map_workers": 0,
+    "map_chunksize": 0,
+}
+
+# Run settings copied over from project_settings.json
+PROJECT_RUN_SETTINGS = ("max_workers", "result_cache_mb", "result_cache_compression", "async_limit",
+                        "memory_budget_mb", "trace_memory")
+
+# Fields that belong to a block's place on a canvas and stay out of block templates
+CANVAS_ONLY_FIELDS = ("id", "is_start_block", "is_sink", "pinned")
+
+
+def executor_block(block):
+    return {field: block.get(field, copy.deepcopy(default)) for field, default in EXECUTOR_FIELDS.items()}
+
+
+def block_settings(block, skip=()):
+    """A canvas Block's executor fields as a dict (outputs are an OutputsProxy, so callers add them)."""
+    return {field: getattr(block, field, default) for field, default in EXECUTOR_FIELDS.items()
+            if field != "outputs" and field not in skip}
+
+
+def apply_block_settings(block, data, skip=()):
+    """Set a Block's executor fields from saved data, with the defaults for missing ones."""
+    for field, default in EXECUTOR_FIELDS.items():
+        if field != "outputs" and field not in skip:
+            setattr(block, field, copy.deepcopy(data.get(field, default)))
+
+
+def find_project(graph_path):
+    """The project directory a graph belongs to and its settings, or (graph's folder, {})."""
+    graph_dir = Path(graph_path).resolve().parent
+    for directory in (graph_dir, *graph_dir.parents):
+        settings_path = directory / PROJECT_FILE_NAME
+        if settings_path.is_file():
+            try:
+                with open(settings_path, "r") as f:
+                    return directory, json.load(f)
+            except (OSError, ValueError):
+                return directory, {}
+    return graph_dir, {}
+
+
+def resolve_map_graphs(blocks, project_dir):
+    """Map blocks may name their sub-graph relative to the project; make those paths absolute."""
+    for block in blocks:
+        if block.get("block_type") == "map" and block.get("map_graph") and project_dir:
+            path = Path(block["map_graph"])
+            if not path.is_absolute():
+                block["map_graph"] = str(Path(project_dir) / path)
+    return blocks
+
+
+def block_definition(block, _seen=()):
+    """
+    Text standing for everything that decides what a block computes apart
+    from its inputs, for fingerprints and result cache keys: the code and,
+    for map blocks, the settings and contents of the sub-graph it runs.
+    """
+    code = block.get("code", "")
+    if block.get("block_type") != "map":
+        return code
+
+    path = block.get("map_graph")
+    parts = [code, str(path), str(block.get("map_workers")), str(block.get("map_chunksize"))]
+    if path and path not in _seen:
+        try:
+            sub_blocks = load_graph(path)["blocks"]
+        except (OSError, ValueError):
+            sub_blocks = []
+        for sub in sub_blocks:
+            parts.append(json.dumps({
+                "definition": block_definition(sub, (*_seen, path)),
+                "input_mappings": sub.get("input_mappings", {}),
+                "requirements": sorted(sub.get("requirements", [])),
+                "is_start_block": sub.get("is_start_block", False),
+            }, sort_keys=True))
+    return "\0".join(parts)
+
+
+def load_graph(path):
+    """
+    Load a .quark file (or a graph the GUI exported) as a dict run_graph_data
+    accepts: blocks plus run settings from the surrounding project.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    if "connections" not in data and "project_dir" in data:
+        return data  # already exported by engine.run_all_blocks
+
+    project_dir, settings = find_project(path)
+    graph = {
+        "blocks": resolve_map_graphs([executor_block(b) for b in data.get("blocks", [])], project_dir),
+        "graph_path": str(Path(path).resolve()),
+        "project_dir": str(project_dir),
+        "run_timeout_s": data.get("run_timeout_s"),
+    }
+    for key in PROJECT_RUN_SETTINGS:
+        if settings.get(key) is not None:
+            graph[key] = settings[key]
+    return graph
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+from pathlib import Path
+from types import SimpleNamespace
+
+from backend.code_cache import code_hash
+from backend.graph_file import block_definition
+from backend.spill import Spilled
+
+
+def block_fingerprint(block, source_fingerprints):
+    """
+    Hash of everything that decides a block's outputs: its code (for map
+    blocks, also the sub-graph), its requirements and, for every input, the
+    fingerprint of the block feeding it plus the output it reads. Upstream
+    changes therefore ripple down.
+    """
+    resolved_inputs = []
+    for input_name, mapping in sorted(block.get("input_mappings", {}).items()):
+        if not mapping:
+            continue
+        source_id = mapping.get("block_id")
+        resolved_inputs.append([input_name, source_fingerprints.get(source_id), mapping.get("output_name")])
+
+    payload = json.dumps({
+        "code": code_hash(block_definition(block)),
+        "requirements": sorted(block.get("requirements", [])),
+        "inputs": resolved_inputs,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def compute_fingerprints(ordered_blocks):
+    """Fingerprint blocks given in topological order. Returns {block_id: fingerprint}."""
+    fingerprints = {}
+    for block in ordered_blocks:
+        fingerprints[block["id"]] = block_fingerprint(block, fingerprints)
+    return fingerprints
+
+
+def graph_key(graph_path):
+    """Short stable name for the snapshot directory of one .quark file."""
+    if not graph_path:
+        return "untitled"
+    return hashlib.sha1(str(Path(graph_path).resolve()).encode("utf-8")).hexdigest()[:12]
+
+
+def link_or_copy(source, target):
+    """Put `source` at `target`, hard-linked where the filesystem allows."""
+    tmp = target.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        os.link(source, tmp)
+    except OSError:
+        shutil.copyfile(source, tmp)
+    os.replace(tmp, target)
+
+
+class LastRunStore:
+    """
+    Outputs of the previous run of one graph, one pickle per block plus a
+    manifest of the fingerprint each pickle was produced under. A block whose
+    fingerprint still matches can reuse its outputs instead of running.
+    Outputs already spilled to disk (backend/spill.py) aren't read back to be
+    pickled: their files are linked next to the pickle instead, which only
+    keeps a reference to them.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.directory / "manifest.json"
+        try:
+            with open(self.manifest_path, "r") as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {}
+
+    def _outputs_path(self, block_id):
+        return self.directory / f"{block_id}.pkl"
+
+    def _spilled_paths(self, block_id):
+        return [path for path in self.directory.glob(f"{block_id}.spill-*") if path.suffix != ".tmp"]
+
+    def load(self, block_id, fingerprint):
+        """Return the saved outputs if they were made under `fingerprint`, else None."""
+        if self.manifest.get(block_id) != fingerprint:
+            return None
+        try:
+            with open(self._outputs_path(block_id), "rb") as f:
+                outputs_ns = pickle.load(f)
+            for name, value in vars(outputs_ns).items():
+                if isinstance(value, Spilled):
+                    setattr(outputs_ns, name, Spilled(self.directory / value.path, value.kind, value.nbytes).load())
+            return outputs_ns
+        except Exception:
+            return None
+
+    def save(self, block_id, fingerprint, outputs_ns):
+        """Remember a block's outputs. Returns False if they can't be pickled."""
+        path = self._outputs_path(block_id)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            values = vars(outputs_ns)
+            if any(isinstance(value, Spilled) for value in values.values()):
+                outputs_ns = SimpleNamespace(**values)
+                for name, value in values.items():
+                    if isinstance(value, Spilled):
+                        filename = f"{block_id}.spill-{name}{value.path.suffix}"
+                        link_or_copy(value.path, self.directory / filename)
+                        setattr(outputs_ns, name, Spilled(filename, value.kind, value.nbytes))
+            # Straight into the file: pickling to bytes first would hold a second copy of the outputs
+            with open(tmp, "wb") as f:
+                pickle.dump(outputs_ns, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            tmp.unlink(missing_ok=True)
+            self.forget(block_id)
+            return False
+
+        os.replace(tmp, path)
+        self.manifest[block_id] = fingerprint
+        return True
+
+    def adopt(self, other, block_id):
+        """Take over another store's snapshot of a block, hard-linked where the filesystem allows."""
+        fingerprint = other.manifest.get(block_id)
+        if fingerprint is None:
+            return False
+        try:
+            for spilled_path in other._spilled_paths(block_id):
+                link_or_copy(spilled_path, self.directory / spilled_path.name)
+            link_or_copy(other._outputs_path(block_id), self._outputs_path(block_id))
+        except OSError:
+            self.forget(block_id)
+            return False
+        self.manifest[block_id] = fingerprint
+        return True
+
+    def forget(self, block_id):
+        self.manifest.pop(block_id, None)
+
+    def flush(self):
+        tmp = self.manifest_path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)
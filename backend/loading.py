@@ -4,6 +4,7 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 from backend.inputs_proxy import InputsProxy
 from backend.outputs_proxy import OutputsProxy
+from backend.graph_file import apply_block_settings, CANVAS_ONLY_FIELDS
 
 
 from frontend.block import Block
@@ -19,6 +20,8 @@ def load_file(self, filename, controller):
         data = json.loads(contents)
 
 
+    self.run_timeout_s = data.get("run_timeout_s", 0)
+
     # Clear current layout
     for block in self.blocks:
         self.scene.removeItem(block)
@@ -31,17 +34,12 @@ def load_file(self, filename, controller):
     id_to_block = {}
     for block_data in data["blocks"]:
         block = Block(block_data["name"], self.tab_widget, self,  controller=controller)
-        block.block_type = block_data["block_type"]
-        block.id = block_data["id"]
-        block.requirements =  block_data.get("requirements", [])
+        apply_block_settings(block, block_data)
         block.background_color = block_data["background_color"]
-        block.code = block_data.get("code", "")
         block.inputs = InputsProxy()
         block.inputs.from_dict(block_data.get("inputs", {}))
         block.outputs = OutputsProxy()
         block.outputs.from_dict(block_data.get("outputs", {}))
-        block.input_mappings = block_data.get("input_mappings", {})
-        block.is_start_block = block_data.get("is_start_block", False)
         block.setPos(block_data["x"], block_data["y"])
         self.scene.addItem(block)
         self.blocks.append(block)
@@ -57,23 +55,17 @@ def load_file(self, filename, controller):
 
 def load_block_from_template(self, template, controller):
     name = template.get("name", "Unnamed Block")
-    code = template.get("code", "")
-    block_type = template.get("block_type", "code")
-    requirements = template.get("depenedencies", [])
     background_color =  template.get("background_color", "#74b9ff")
     inputs = InputsProxy()
     inputs.from_dict(template.get("inputs", {}))
 
     outputs = OutputsProxy()
     outputs.from_dict(template.get("outputs", {}))
-    input_mappings = template.get("input_mappings", {})
 
     block = Block(name, self.tab_widget, self, background_color, controller=controller)
-    block.block_type = block_type
-    block.code = code
+    apply_block_settings(block, template, skip=CANVAS_ONLY_FIELDS)
     block.inputs = inputs
     block.outputs = outputs
-    block.input_mappings = input_mappings
     block.setPos(100 + len(self.blocks) * 30, 100 + len(self.blocks) * 20)
 
     return block
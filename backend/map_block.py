@@ -0,0 +1,50 @@
+# map_block.py
+#
+# A map block runs a whole sub-graph (another .quark file) once per element
+# of its `items` input, spread over a pool of worker processes, and collects
+# the results in input order:
+#
+#   outputs.results  one dict per element: the sub-graph's sink outputs, merged
+#                    (None where a sub-graph block failed)
+#   outputs.errors   [(index, [failed block names]), ...]
+#
+# Each element is laid over the sub-graph's start block outputs the same way
+# batch mode binds records: dicts field by field, anything else as `value`.
+# The map block's other inputs are passed to every element as extra fields.
+
+from types import SimpleNamespace
+
+from backend.graph_file import load_graph
+
+ITEMS_INPUT = "items"
+
+
+def as_record(item):
+    return dict(item) if isinstance(item, dict) else {"value": item}
+
+
+def run_map_block(block, inputs):
+    # Imported here: batch pulls in the executor, which imports the block runtime
+    from backend.batch import map_records
+
+    if not block.get("map_graph"):
+        raise ValueError("Map block has no sub-graph selected")
+    if ITEMS_INPUT not in inputs:
+        raise ValueError(f"Map block needs an '{ITEMS_INPUT}' input")
+
+    shared = {name: value for name, value in inputs.items() if name != ITEMS_INPUT}
+    records = [{**shared, **as_record(item)} for item in inputs[ITEMS_INPUT]]
+    sub_blocks = load_graph(block["map_graph"])["blocks"]
+
+    results, errors = [], []
+    if records:
+        for result in map_records(sub_blocks, records, block.get("map_workers") or None, block.get("map_chunksize") or None):
+            if result["failed"]:
+                results.append(None)
+                errors.append((result["index"], result["failed"]))
+                continue
+            merged = {}
+            for sink_outputs in result["outputs"].values():
+                merged.update(sink_outputs)
+            results.append(merged)
+    return SimpleNamespace(results=results, errors=errors)
@@ -0,0 +1,121 @@
+# preload.py
+#
+# Process blocks run in worker processes that would otherwise each import
+# numpy, cv2, torch, pandas... on their own. Where the platform can fork,
+# workers are instead started from a multiprocessing forkserver that has
+# already imported every module the graph's blocks use (their top-level
+# imports and their declared requirements) and frozen the garbage collector
+# (backend/forkserver_template.py): a new worker starts with those libraries
+# loaded and shares their memory copy-on-write. Elsewhere (Windows) each
+# worker imports the same modules when it starts, before its first block.
+
+import os
+import re
+import ast
+import threading
+import importlib
+import importlib.util
+import importlib.metadata
+import multiprocessing
+
+# Read by backend/forkserver_template.py, which mustn't be imported here
+PRELOAD_ENV = "PROTO_PRELOAD_MODULES"
+
+_lock = threading.Lock()
+_forkserver_modules = None  # what the running forkserver was started with
+_distribution_modules = None
+
+
+def distribution_modules():
+    """{normalized distribution name: [top-level modules]} of what's installed, e.g. opencv-python -> cv2."""
+    global _distribution_modules
+    if _distribution_modules is None:
+        mapping = {}
+        try:
+            for module, distributions in importlib.metadata.packages_distributions().items():
+                for distribution in distributions:
+                    mapping.setdefault(normalize(distribution), []).append(module)
+        except Exception:
+            pass
+        _distribution_modules = mapping
+    return _distribution_modules
+
+
+def normalize(name):
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def requirement_name(requirement):
+    """'pandas==2.2.2' -> 'pandas'."""
+    return re.split(r"[\s<>=!~;\[]", requirement.strip(), maxsplit=1)[0]
+
+
+def block_imports(code):
+    """Top-level module names a block body imports at its own top level."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return set()
+    names = set()
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.add(node.module.split(".")[0])
+    return names
+
+
+def graph_modules(blocks):
+    """Importable modules the given blocks use, sorted."""
+    names = set()
+    for block in blocks:
+        names |= block_imports(block.get("code", ""))
+        for requirement in block.get("requirements", []):
+            requirement = requirement if isinstance(requirement, str) else requirement.get("name", "")
+            distribution = requirement_name(requirement)
+            names.update(distribution_modules().get(normalize(distribution), [distribution.replace("-", "_")]))
+    modules = []
+    for name in sorted(names):
+        try:
+            if name.isidentifier() and importlib.util.find_spec(name) is not None:
+                modules.append(name)
+        except (ImportError, ValueError):
+            pass
+    return modules
+
+
+def import_modules(modules):
+    """Worker initializer where there's no forkserver: import up front, ignoring failures."""
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass
+
+
+def can_forkserver():
+    return "forkserver" in multiprocessing.get_all_start_methods()
+
+
+def worker_context(modules):
+    """
+    (mp_context, initializer, initargs) for worker processes that should
+    start with `modules` imported. There is one forkserver per process and
+    its workers depend on it, so it is never restarted: it preloads what the
+    first graph needing it uses, and workers import anything later graphs
+    add on top when they start.
+    """
+    global _forkserver_modules
+    if not can_forkserver():
+        return multiprocessing.get_context("spawn"), import_modules, (modules,)
+
+    context = multiprocessing.get_context("forkserver")
+    with _lock:
+        if _forkserver_modules is None:
+            os.environ[PRELOAD_ENV] = ",".join(modules)
+            context.set_forkserver_preload(["backend.forkserver_template"])
+            _forkserver_modules = set(modules)
+        missing = [name for name in modules if name not in _forkserver_modules]
+    if missing:
+        return context, import_modules, (missing,)
+    return context, None, ()
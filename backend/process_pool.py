@@ -0,0 +1,193 @@
+import os
+import queue
+import signal
+import threading
+import weakref
+import traceback
+import multiprocessing
+import multiprocessing.util
+from concurrent.futures import Future
+
+# Workers aren't daemonic, so blocks running in them can start processes of
+# their own (a map block on the process target, a multiprocessing.Pool). At
+# exit multiprocessing joins non-daemonic children, which would wait forever
+# on idle workers of a pool nobody shut down, so those are stopped first.
+_live_slots = weakref.WeakSet()
+_finalizer_pid = None
+
+
+def _stop_workers_at_exit():
+    for slot in list(_live_slots):
+        process = slot.process
+        if process is not None and process.pid is not None and process.is_alive():
+            process.terminate()
+
+
+class WorkerDied(RuntimeError):
+    """The process running a task exited (crashed or was killed) before answering."""
+
+
+def _worker_main(conn, initializer, initargs):
+    if initializer is not None:
+        initializer(*initargs)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        fn, args = task
+        try:
+            reply = (True, fn(*args))
+        except BaseException as e:
+            reply = (False, e)
+        try:
+            conn.send(reply)
+        except Exception:
+            # The result or exception didn't pickle; send something that does
+            conn.send((False, RuntimeError(f"{type(reply[1]).__name__}: {reply[1]}\n{traceback.format_exc()}")))
+
+
+def exit_description(code):
+    """How a worker process ended, from its exit code (negative: the signal that killed it)."""
+    if code is None:
+        return "worker process exited"
+    if code < 0:
+        try:
+            return f"worker process was killed by {signal.Signals(-code).name}"
+        except ValueError:
+            return f"worker process was killed by signal {-code}"
+    return f"worker process exited with code {code}"
+
+
+class _Slot:
+    """One worker process and the parent-side thread that feeds it tasks."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.process = None
+        self.conn = None
+        self.future = None
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def start_process(self):
+        global _finalizer_pid
+        parent_conn, child_conn = self.pool.context.Pipe()
+        self.process = self.pool.context.Process(
+            target=_worker_main, args=(child_conn, self.pool.initializer, self.pool.initargs), daemon=False
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        _live_slots.add(self)
+        if _finalizer_pid != os.getpid():
+            # Runs before multiprocessing joins the children at exit
+            multiprocessing.util.Finalize(None, _stop_workers_at_exit, exitpriority=20)
+            _finalizer_pid = os.getpid()
+
+    def stop_process(self, kill=False):
+        if self.process is None:
+            return
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+        self.process.join(timeout=None if not kill else 5)
+        self.conn.close()
+        self.process = self.conn = None
+
+    def serve(self):
+        while True:
+            item = self.pool._tasks.get()
+            if item is None:
+                self.stop_process()
+                return
+            future, fn, args = item
+            with self.pool._lock:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                self.future = future
+            try:
+                if self.process is None or not self.process.is_alive():
+                    self.start_process()
+                self.conn.send((fn, args))
+                ok, value = self.conn.recv()
+            except (EOFError, OSError):
+                process = self.process
+                if process is not None:
+                    # The pipe closes as the process dies; its exit code is only there once it's reaped
+                    process.join(timeout=1)
+                self.stop_process(kill=True)
+                ok, value = False, WorkerDied(exit_description(process.exitcode if process is not None else None))
+            except BaseException as e:
+                ok, value = False, e
+            with self.pool._lock:
+                self.future = None
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+
+class KillableProcessPool:
+    """
+    A process pool where one task can be killed without taking the others
+    down: kill(future) terminates the process running it, the future fails
+    with WorkerDied and the slot starts a fresh process for its next task.
+    (ProcessPoolExecutor marks the whole pool broken when a worker dies.)
+    """
+
+    def __init__(self, max_workers=None, mp_context=None, initializer=None, initargs=()):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.context = mp_context or multiprocessing.get_context()
+        self.initializer = initializer
+        self.initargs = initargs
+        self._tasks = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._slots = []
+        self._shutdown = False
+
+    def submit(self, fn, *args):
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot submit to a pool that was shut down")
+            busy = sum(1 for slot in self._slots if slot.future is not None)
+            if busy + self._tasks.qsize() >= len(self._slots) and len(self._slots) < self.max_workers:
+                self._slots.append(_Slot(self))
+        self._tasks.put((future, fn, args))
+        return future
+
+    def kill(self, future):
+        """Stop the task behind `future`: cancel it if queued, kill its process if running."""
+        if future.cancel():
+            return True
+        with self._lock:
+            for slot in self._slots:
+                if slot.future is future and slot.process is not None:
+                    slot.process.kill()
+                    return True
+        return False
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        with self._lock:
+            self._shutdown = True
+            slots = list(self._slots)
+        if cancel_futures:
+            while True:
+                try:
+                    item = self._tasks.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    item[0].cancel()
+        for _ in slots:
+            self._tasks.put(None)
+        if wait:
+            for slot in slots:
+                slot.thread.join()
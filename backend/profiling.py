@@ -0,0 +1,105 @@
+import sys
+import time
+import threading
+import tracemalloc
+
+
+class MemoryPeaks:
+    """
+    Peak traced memory per block. tracemalloc only keeps one process-wide
+    peak, so it is reset only when no other block is running; blocks that
+    overlap share a window and may report each other's allocations, but a
+    block's figure never misses its own peak. Tracing slows every
+    allocation in the process down, so it is only on while a traced block
+    runs (unless something else had already turned it on).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = 0
+        self._started = False  # whether we turned tracemalloc on
+
+    def start(self):
+        with self._lock:
+            if self._active == 0:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    self._started = True
+                tracemalloc.reset_peak()
+            self._active += 1
+            return tracemalloc.get_traced_memory()[0]
+
+    def stop(self, baseline):
+        with self._lock:
+            self._active -= 1
+            peak = tracemalloc.get_traced_memory()[1]
+            if self._active == 0 and self._started:
+                tracemalloc.stop()
+                self._started = False
+        return max(0, peak - baseline)
+
+
+_peaks = MemoryPeaks()
+
+
+def profile_call(fn, *args, trace_memory=False):
+    """Call fn(*args) and return (result, profile dict). Exceptions propagate unprofiled."""
+    baseline = _peaks.start() if trace_memory else None
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    try:
+        result = fn(*args)
+    finally:
+        cpu = time.thread_time() - cpu_start
+        wall = time.perf_counter() - wall_start
+        peak = _peaks.stop(baseline) if trace_memory else None
+
+    return result, {"wall_s": wall, "cpu_s": cpu, "peak_mem_bytes": peak}
+
+
+def value_size(value):
+    """Cheap size estimate: the buffer size for arrays/bytes, otherwise the shallow object size."""
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    try:
+        return sys.getsizeof(value)
+    except TypeError:
+        return 0
+
+
+def outputs_size(outputs_ns):
+    return sum(value_size(v) for v in vars(outputs_ns).values())
+
+
+def format_bytes(n):
+    if n is None:
+        return "-"
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def format_profile_table(profiles, run_wall_s):
+    """Text table of block profiles, slowest first."""
+    rows = sorted(profiles, key=lambda p: p.get("wall_s") or 0, reverse=True)
+    name_width = max([len("Block")] + [len(p["name"]) for p in rows])
+    name_width = min(name_width, 40)
+
+    lines = [
+        f"{'Block':<{name_width}}  {'Status':<8} {'Target':<8} {'Wall s':>8} {'CPU s':>8} {'Peak mem':>10} {'Output':>10}",
+        "-" * (name_width + 60),
+    ]
+    for p in rows:
+        wall = f"{p['wall_s']:.3f}" if p.get("wall_s") is not None else "-"
+        cpu = f"{p['cpu_s']:.3f}" if p.get("cpu_s") is not None else "-"
+        lines.append(
+            f"{p['name'][:name_width]:<{name_width}}  {p['status']:<8} {p.get('target') or '-':<8} {wall:>8} {cpu:>8} "
+            f"{format_bytes(p.get('peak_mem_bytes')):>10} {format_bytes(p.get('output_bytes')):>10}"
+        )
+
+    busy = sum(p.get("wall_s") or 0 for p in rows)
+    lines.append("-" * (name_width + 60))
+    lines.append(f"Run wall time {run_wall_s:.3f}s, summed block time {busy:.3f}s")
+    return "\n".join(lines)
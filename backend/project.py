@@ -4,11 +4,19 @@ import sys
 import subprocess
 
 class Project:
-    def __init__(self, base_path: str, project_type: str = "hadron", terminal_status=False, gen_env=False, env_path='', pip_path='', python_path=''):
+    def __init__(self, base_path: str, project_type: str = "hadron", terminal_status=False, gen_env=False, env_path='', pip_path='', python_path='', max_workers=None,
+                 result_cache_mb=1024, result_cache_compression="zlib", async_limit=32,
+                 memory_budget_mb=0, trace_memory=False):
         self.name = Path(base_path).name
         self.base_path = Path(base_path)
         self.project_type = project_type
         self.open_terminal = terminal_status
+        self.max_workers = max_workers  # None lets the executor pick from the CPU count
+        self.result_cache_mb = result_cache_mb
+        self.result_cache_compression = result_cache_compression
+        self.async_limit = async_limit  # async blocks in flight at once, see backend/async_runtime.py
+        self.memory_budget_mb = memory_budget_mb  # block outputs held before large ones spill to disk, 0 for no limit
+        self.trace_memory = trace_memory  # measure peak memory per block, slows runs down
         if gen_env:
             self.env_path, self.pip_path, self.python_path = self.create_env()
         else:
@@ -30,7 +38,13 @@ class Project:
             "open_terminal": self.open_terminal,
             "env_path" : str(self.env_path),
             "pip_path" : str(self.pip_path),
-            "python_path" : str(self.python_path) 
+            "python_path" : str(self.python_path),
+            "max_workers" : self.max_workers,
+            "result_cache_mb" : self.result_cache_mb,
+            "result_cache_compression" : self.result_cache_compression,
+            "async_limit" : self.async_limit,
+            "memory_budget_mb" : self.memory_budget_mb,
+            "trace_memory" : self.trace_memory
         }
 
     def save(self):
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import lzma
+import os
+import pickle
+import time
+import zlib
+from pathlib import Path
+
+from backend.code_cache import code_hash
+from backend.graph_file import block_definition
+
+COMPRESSIONS = ("none", "zlib", "lzma")
+DEFAULT_MAX_MB = 1024
+DEFAULT_COMPRESSION = "zlib"
+
+_SUFFIXES = {"none": ".pkl", "zlib": ".pkl.zz", "lzma": ".pkl.xz"}
+
+
+def _compress(data, compression):
+    if compression == "zlib":
+        return zlib.compress(data, 6)
+    if compression == "lzma":
+        return lzma.compress(data)
+    return data
+
+
+def _decompress(data, compression):
+    if compression == "zlib":
+        return zlib.decompress(data)
+    if compression == "lzma":
+        return lzma.decompress(data)
+    return data
+
+
+def result_key(block, inputs):
+    """
+    Content address of a block run: its code, its requirements and the
+    actual input values. Returns None if the inputs can't be pickled, in
+    which case the block simply isn't cached this time.
+    """
+    try:
+        input_bytes = pickle.dumps(sorted(inputs.items()), protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        return None
+
+    digest = hashlib.sha256()
+    digest.update(code_hash(block_definition(block)).encode("utf-8"))
+    digest.update(json.dumps(sorted(block.get("requirements", []))).encode("utf-8"))
+    digest.update(input_bytes)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Project-level store of block outputs, content-addressed by result_key.
+    Entries are pickled (optionally zlib/lzma compressed) under
+    <dir>/<key[:2]>/<key>.pkl*, with an index tracking size and last use so
+    the least recently used entries go first once max_bytes is exceeded.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_MB * 1024 * 1024, compression=DEFAULT_COMPRESSION):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression {compression!r} (expected one of {', '.join(COMPRESSIONS)})")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.compression = compression
+        self.index_path = self.directory / "index.json"
+        self.hits = 0
+        self.misses = 0
+        try:
+            with open(self.index_path, "r") as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+
+    def _entry_path(self, key, compression):
+        return self.directory / key[:2] / f"{key}{_SUFFIXES[compression]}"
+
+    def get(self, key):
+        entry = self.index.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        try:
+            data = self._entry_path(key, entry["compression"]).read_bytes()
+            outputs_ns = pickle.loads(_decompress(data, entry["compression"]))
+        except Exception:
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        entry["last_used"] = time.time()
+        self.hits += 1
+        return outputs_ns
+
+    def put(self, key, outputs_ns):
+        """Store a block's outputs. Returns False if they can't be pickled."""
+        try:
+            data = _compress(pickle.dumps(outputs_ns, protocol=pickle.HIGHEST_PROTOCOL), self.compression)
+        except Exception:
+            return False
+        if len(data) > self.max_bytes:
+            return False  # would evict everything else and still not fit
+
+        if key in self.index:
+            self._remove(key)
+        path = self._entry_path(key, self.compression)
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+        self.index[key] = {"size": len(data), "compression": self.compression, "last_used": time.time()}
+        self.evict()
+        return True
+
+    def total_bytes(self):
+        return sum(entry["size"] for entry in self.index.values())
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        total = self.total_bytes()
+        for key in sorted(self.index, key=lambda k: self.index[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= self.index[key]["size"]
+            self._remove(key)
+
+    def _remove(self, key):
+        entry = self.index.pop(key, None)
+        if entry is None:
+            return
+        try:
+            self._entry_path(key, entry["compression"]).unlink()
+        except OSError:
+            pass
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self.index),
+            "bytes": self.total_bytes(),
+        }
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def flush(self):
+        tmp = self.index_path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.index, f)
+        os.replace(tmp, self.index_path)
@@ -0,0 +1,30 @@
+# retry.py
+#
+# Per-block retry policies for flaky blocks (network calls, devices that
+# come and go). A block with "retries": N is run up to N more times when it
+# raises, waiting "retry_backoff_s" seconds before the first retry and twice
+# as long before each one after. "retry_on" limits retries to some
+# exception types, by class name (base classes match too, so "OSError"
+# covers ConnectionError); empty means any exception. Blocks that time out
+# or are stopped are not retried, nor are blocks reading a stream input,
+# since the items they already took can't be read again.
+
+# Longest wait between two attempts, however many there were
+MAX_BACKOFF_S = 300
+
+
+def should_retry(block, error, attempts):
+    """Whether a block that raised `error` after `attempts` retries gets another go."""
+    if attempts >= int(block.get("retries") or 0):
+        return False
+    retry_on = block.get("retry_on") or []
+    if not retry_on:
+        return True
+    return any(cls.__name__ in retry_on for cls in type(error).__mro__)
+
+
+def retry_delay(block, attempt):
+    """Seconds to wait before retry number `attempt` (1-based)."""
+    backoff = block.get("retry_backoff_s")
+    backoff = 1.0 if backoff is None else float(backoff)
+    return min(backoff * 2 ** (attempt - 1), MAX_BACKOFF_S)
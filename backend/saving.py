@@ -1,29 +1,25 @@
 import json
 from PyQt6.QtWidgets import QFileDialog
 import json
+from backend.graph_file import block_settings, CANVAS_ONLY_FIELDS
 
 def save_file(self, filename):
         data = {
             "blocks": [],
-            "connections": []
+            "connections": [],
+            "run_timeout_s": getattr(self, "run_timeout_s", 0),
         }
 
         for block in self.blocks:
             
             print(block.input_mappings if hasattr(block.input_mappings, "to_dict") else {}, "hi")
             data["blocks"].append({
-                "id": block.id,
-                "name": block.name,
-                "block_type" : block.block_type,
+                **block_settings(block),
                 "background_color" : block.background_color,
                 "x": block.pos().x(),
                 "y": block.pos().y(),
-                "code": getattr(block, "code", ""),
                 "inputs": block.inputs.to_dict() if hasattr(block.inputs, "to_dict") else {},
                 "outputs": block.outputs.to_dict() if hasattr(block.outputs, "to_dict") else {},
-                "input_mappings": block.input_mappings if hasattr(block, "input_mappings") else {},
-                "is_start_block": getattr(block, "is_start_block", False),
-                "requirements": block.requirements,
             })
 
         
@@ -58,14 +54,10 @@ def save_to_template(block):
         path += ".hdrn"
 
     template = {
-        "name": block.name,
-        "code": block.code,
-        "block_type": block.block_type,
+        **block_settings(block, skip=CANVAS_ONLY_FIELDS),
         "background_color": block.background_color,
         "inputs": block.inputs.to_dict(),
         "outputs": block.outputs.to_dict(),
-        "input_mappings": block.input_mappings,
-        "requirements": block.requirements
     }
 
     with open(path, "w", encoding="utf-8") as f:
@@ -0,0 +1,182 @@
+# shm_transport.py
+#
+# Moves block values between the executor and process-targeted blocks
+# without pushing large buffers through the worker pipe. Every value is
+# pickled with protocol 5; out-of-band buffers (ndarray data, and large
+# bytes/bytearray objects) of at least SHM_THRESHOLD bytes are copied once
+# into a multiprocessing.shared_memory segment and only the segment name
+# crosses the boundary. Receivers rebuild the value over a read-only view of
+# the segment, so every consumer shares the same memory.
+
+import os
+import pickle
+import io
+from multiprocessing import shared_memory
+
+SHM_THRESHOLD = 64 * 1024
+
+# On Windows a segment disappears as soon as its creator closes it, so
+# worker processes can't hand segments back to the executor there. Their
+# outputs still use protocol 5, just with the buffers in-band.
+WORKERS_CAN_EXPORT = os.name != "nt"
+
+
+class SegmentRef:
+    __slots__ = ("name", "size")
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+
+
+class Packed:
+    """A pickled value plus its out-of-band buffers (inline bytes or SegmentRefs)."""
+    __slots__ = ("payload", "buffers")
+
+    def __init__(self, payload, buffers):
+        self.payload = payload
+        self.buffers = buffers
+
+    def segment_names(self):
+        return [b.name for b in self.buffers if isinstance(b, SegmentRef)]
+
+
+def _rebuild_bytes(buffer):
+    return bytes(buffer)
+
+
+def _rebuild_bytearray(buffer):
+    return bytearray(buffer)
+
+
+class _Pickler(pickle.Pickler):
+    # bytes/bytearray are always pickled in-band, route big ones through a
+    # PickleBuffer so they can go out-of-band like ndarray data does
+    def reducer_override(self, obj):
+        if type(obj) is bytes and len(obj) >= SHM_THRESHOLD:
+            return _rebuild_bytes, (pickle.PickleBuffer(obj),)
+        if type(obj) is bytearray and len(obj) >= SHM_THRESHOLD:
+            return _rebuild_bytearray, (pickle.PickleBuffer(obj),)
+        return NotImplemented
+
+
+def pack(value, segments, use_shm=True):
+    """
+    Pickle `value`, moving large buffers into new shared memory segments.
+    Created SharedMemory objects are appended to `segments`; the caller owns
+    them (close them, and unlink once every consumer is done).
+    """
+    buffers = []
+
+    def place(pickle_buffer):
+        view = pickle_buffer.raw()
+        if not use_shm or view.nbytes < SHM_THRESHOLD:
+            return True  # small enough to stay in the payload
+        shm = shared_memory.SharedMemory(create=True, size=max(view.nbytes, 1))
+        shm.buf[:view.nbytes] = view
+        segments.append(shm)
+        buffers.append(SegmentRef(shm.name, view.nbytes))
+        return False
+
+    stream = io.BytesIO()
+    _Pickler(stream, protocol=5, buffer_callback=place).dump(value)
+    return Packed(stream.getvalue(), buffers)
+
+
+def unpack(packed, attached):
+    """
+    Rebuild a packed value. Segments it maps are added to `attached`
+    ({name: SharedMemory}) and must stay open while the value is in use.
+    """
+    views = []
+    for ref in packed.buffers:
+        if isinstance(ref, SegmentRef):
+            shm = attached.get(ref.name)
+            if shm is None:
+                shm = attached[ref.name] = shared_memory.SharedMemory(name=ref.name)
+            views.append(shm.buf[:ref.size].toreadonly())
+        else:
+            views.append(ref)
+    return pickle.loads(packed.payload, buffers=views)
+
+
+def close_segment(shm, unlink=False):
+    try:
+        shm.close()
+    except BufferError:
+        # Values still point into the mapping. Hand it over to them: the mmap
+        # is unmapped once the last view is garbage collected, and the
+        # SharedMemory wrapper no longer tries (and fails) to close it.
+        shm._buf = None
+        shm._mmap = None
+        shm.close()
+    if unlink:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class TransportRegistry:
+    """
+    Executor-side bookkeeping for one run. Each block's packed outputs are
+    memoized so every process consumer of a value shares one segment, and a
+    block's segments are unlinked once all of its consumers have run.
+    """
+
+    def __init__(self, consumer_counts):
+        self.pending = dict(consumer_counts)  # block_id -> consumers still to run
+        self.packed = {}    # (block_id, output_name) -> Packed
+        self.owned = {}     # block_id -> [SharedMemory] to unlink when released
+        self.attached = {}  # segment name -> SharedMemory mapped by the executor
+
+    def pack_output(self, block_id, output_name, value):
+        key = (block_id, output_name)
+        if key not in self.packed:
+            self.packed[key] = pack(value, self.owned.setdefault(block_id, []))
+        return self.packed[key]
+
+    def pack_inputs(self, block, inputs):
+        """Pack a block's resolved inputs, sharing segments with other consumers of the same output."""
+        packed = {}
+        mappings = block.get("input_mappings", {})
+        for input_name, value in inputs.items():
+            mapping = mappings.get(input_name) or {}
+            packed[input_name] = self.pack_output(mapping.get("block_id"), mapping.get("output_name"), value)
+        return packed
+
+    def adopt_outputs(self, block_id, packed_outputs):
+        """Unpack what a process block sent back and take ownership of its segments."""
+        outputs = {}
+        owned = self.owned.setdefault(block_id, [])
+        for name, packed in packed_outputs.items():
+            outputs[name] = unpack(packed, self.attached)
+            owned.extend(self.attached[n] for n in packed.segment_names())
+            self.packed[(block_id, name)] = packed
+        if self.pending.get(block_id, 0) == 0:
+            self.release(block_id)
+        return outputs
+
+    def consumer_finished(self, source_ids):
+        for source_id in source_ids:
+            if source_id in self.pending:
+                self.pending[source_id] -= 1
+                if self.pending[source_id] == 0:
+                    self.release(source_id)
+
+    def release(self, block_id):
+        # Unlinking only removes the name; views the executor still holds
+        # keep the memory mapped until they are dropped.
+        for shm in self.owned.pop(block_id, []):
+            self.attached.pop(shm.name, None)
+            close_segment(shm, unlink=True)
+        for key in [k for k in self.packed if k[0] == block_id]:
+            del self.packed[key]
+
+    def close(self):
+        for block_id in list(self.owned):
+            self.release(block_id)
+        for shm in self.attached.values():
+            close_segment(shm)
+        self.attached.clear()
+        self.packed.clear()
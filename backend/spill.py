@@ -0,0 +1,93 @@
+# spill.py
+#
+# Keeps a run under a memory budget by moving large block outputs to disk.
+# When the outputs the executor holds exceed the budget, the biggest ndarray
+# and bytes/bytearray values are written to a scratch directory (arrays as
+# .npy, bytes raw) and replaced by Spilled placeholders. A consumer that
+# reads one gets the array back memory-mapped read-only (np.load with
+# mmap_mode="r"), so the run slows down to disk speed instead of running out
+# of RAM; bytes are read back whole.
+
+import os
+import sys
+import shutil
+import tempfile
+from pathlib import Path
+
+from backend.profiling import value_size
+
+# Values smaller than this aren't worth a file
+SPILL_MIN_BYTES = 1024 * 1024
+
+
+class Spilled:
+    """Stands in for an output that was written to disk."""
+    __slots__ = ("path", "kind", "nbytes")
+
+    def __init__(self, path, kind, nbytes):
+        self.path = path
+        self.kind = kind
+        self.nbytes = nbytes
+
+    def load(self):
+        if self.kind == "npy":
+            import numpy as np
+            return np.load(self.path, mmap_mode="r", allow_pickle=False)
+        data = self.path.read_bytes()
+        return bytearray(data) if self.kind == "bytearray" else data
+
+
+def spill_kind(value):
+    """How a value would be written out, or None if it can't be spilled."""
+    if type(value) in (bytes, bytearray):
+        return type(value).__name__
+    np = sys.modules.get("numpy")  # an ndarray can only exist if numpy is already imported
+    if np is not None and isinstance(value, np.ndarray) and not isinstance(value, np.memmap) and not value.dtype.hasobject:
+        return "npy"
+    return None
+
+
+class SpillStore:
+    """Scratch directory of one run's spilled outputs; close() deletes it."""
+
+    def __init__(self, budget_bytes, directory=None):
+        self.budget = budget_bytes
+        if directory is not None:
+            Path(directory).mkdir(parents=True, exist_ok=True)
+            directory = tempfile.mkdtemp(prefix=f"run-{os.getpid()}-", dir=directory)
+        else:
+            directory = tempfile.mkdtemp(prefix="proto-spill-")
+        self.directory = Path(directory)
+        self.spilled = 0
+        self.spilled_bytes = 0
+
+    def spill(self, block_id, outputs_ns):
+        """Write a block's large outputs to disk, replacing them with placeholders. Returns the bytes freed."""
+        freed = 0
+        for name, value in list(vars(outputs_ns).items()):
+            kind = spill_kind(value)
+            nbytes = value_size(value)
+            if kind is None or nbytes < SPILL_MIN_BYTES:
+                continue
+            path = self.directory / f"{block_id}-{self.spilled}.{'npy' if kind == 'npy' else 'bin'}"
+            if kind == "npy":
+                import numpy as np
+                np.save(path, value, allow_pickle=False)
+            else:
+                path.write_bytes(value)
+            setattr(outputs_ns, name, Spilled(path, kind, nbytes))
+            self.spilled += 1
+            self.spilled_bytes += nbytes
+            freed += nbytes
+        return freed
+
+    def restore(self, outputs_ns):
+        """Swap placeholders back for the (memory-mapped) values, for outputs handed back to the caller."""
+        for name, value in vars(outputs_ns).items():
+            if isinstance(value, Spilled):
+                setattr(outputs_ns, name, value.load())
+
+    def close(self):
+        # Arrays still mapped keep their data after the unlink (POSIX); on
+        # Windows mapped files can't be deleted and are left behind
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,197 @@
+# streaming.py
+#
+# Lets a block put a generator on `outputs` and have downstream
+# blocks consume it item by item while it is still producing. A pump thread
+# drives the producer and copies each item into one bounded queue per
+# consuming input; a full queue blocks the pump, so a slow consumer holds the
+# whole chain back instead of letting items pile up in memory.
+#
+# That only works if every consumer of a stream can read at the same time,
+# so consumers get a thread of their own (ConsumerThreads) instead of waiting
+# for a pool thread, possibly behind a sibling that is itself waiting on the
+# pump. The one case left is a consumer that can't start before another
+# consumer of the same stream has finished (it reads that one's outputs
+# too): its queue has to hold the whole stream, and the executor asks for an
+# unbounded one there (see buffered_stream_inputs in block_executor.py).
+
+import threading
+from types import GeneratorType
+from collections import deque
+from concurrent.futures import Future
+
+DEFAULT_STREAM_BUFFER = 8
+
+_END = object()
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+class _Channel:
+    def __init__(self, maxsize):
+        self.items = deque()
+        self.maxsize = maxsize  # None for no limit
+        self.closed = threading.Event()
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        with self._cond:
+            # Time out so a consumer that stops reading early can't wedge the pump
+            while self.maxsize and len(self.items) >= self.maxsize and not self.closed.is_set():
+                self._cond.wait(0.1)
+            if not self.closed.is_set():
+                self.items.append(item)
+                self._cond.notify_all()
+
+    def get(self):
+        with self._cond:
+            # Short waits so a stopped or timed-out consumer gets its BlockCancelled
+            while not self.items:
+                self._cond.wait(0.1)
+            item = self.items.popleft()
+            self._cond.notify_all()
+            return item
+
+
+class StreamReader:
+    """What a consuming block sees as its input: a plain iterator over the stream."""
+
+    def __init__(self, channel, name):
+        self._channel = channel
+        self._name = name
+        self._done = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._done:
+            raise StopIteration
+        item = self._channel.get()
+        if item is _END:
+            self._done = True
+            raise StopIteration
+        if isinstance(item, _Failure):
+            self._done = True
+            raise item.error
+        return item
+
+    def close(self):
+        self._channel.closed.set()
+
+    def __del__(self):
+        # Dropped before the end (e.g. the consumer broke out of its loop)
+        self.close()
+
+    def __reduce__(self):
+        raise TypeError(f"stream '{self._name}' can't leave the executor process (use a thread or inline block)")
+
+    def __repr__(self):
+        return f"<stream {self._name}>"
+
+
+class StreamSource:
+    """
+    Executor-side handle for one streaming output. Channels exist up front
+    for every (consumer block, input name) reading it, so the first items
+    wait for consumers that haven't started yet; the `buffered` ones keep
+    the whole stream instead of `maxsize` items.
+    """
+
+    def __init__(self, iterator, name, consumer_keys, maxsize=DEFAULT_STREAM_BUFFER, buffered=()):
+        self.name = name
+        self.channels = {key: _Channel(None if key in buffered else maxsize) for key in consumer_keys}
+        self.opened = set()
+        self._thread = threading.Thread(target=self._pump, args=(iterator,), name=f"stream:{name}", daemon=True)
+        self._thread.start()
+
+    def _pump(self, iterator):
+        channels = list(self.channels.values())
+        try:
+            for item in iterator:
+                live = [c for c in channels if not c.closed.is_set()]
+                if not live:
+                    break  # everybody stopped listening
+                for channel in live:
+                    channel.put(item)
+            else:
+                for channel in channels:
+                    channel.put(_END)
+        except BaseException as e:
+            # Including BlockCancelled: consumers must hear the stream ended either way
+            for channel in channels:
+                channel.put(_Failure(e))
+        finally:
+            close = getattr(iterator, "close", None)
+            if callable(close):
+                close()
+
+    def open_reader(self, key):
+        self.opened.add(key)
+        return StreamReader(self.channels[key], self.name)
+
+    def decline(self, consumer_id):
+        """Close channels of a consumer that finished without reading them (cached, reused or failed early)."""
+        for key, channel in self.channels.items():
+            if key[0] == consumer_id and key not in self.opened:
+                channel.closed.set()
+
+    def __reduce__(self):
+        raise TypeError(f"stream '{self.name}' can't be pickled")
+
+    def __repr__(self):
+        return f"<stream {self.name}>"
+
+
+class ConsumerThreads:
+    """
+    Runs blocks reading a stream each on a thread of its own, whatever the
+    pool size, so all consumers of a stream read together (see above).
+    They spend most of their time waiting on the producer anyway.
+    """
+
+    def submit(self, fn, *args):
+        future = Future()
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name="stream-consumer", daemon=True).start()
+        return future
+
+
+consumer_threads = ConsumerThreads()
+
+
+def is_stream(value):
+    # Only generators: other iterators (open files, csv.reader, zip...) are
+    # objects in their own right and are passed through as they are
+    return isinstance(value, GeneratorType)
+
+
+def stream_consumers(blocks):
+    """{(source_id, output_name): [(consumer_id, input_name), ...]} across the graph."""
+    consumers = {}
+    for block in blocks:
+        for input_name, mapping in block.get("input_mappings", {}).items():
+            if mapping:
+                key = (mapping.get("block_id"), mapping.get("output_name"))
+                consumers.setdefault(key, []).append((block["id"], input_name))
+    return consumers
+
+
+def wrap_streams(block, outputs_ns, consumers, buffered=()):
+    """Replace generator outputs that something reads with StreamSources."""
+    maxsize = block.get("stream_buffer") or DEFAULT_STREAM_BUFFER
+    for name, value in vars(outputs_ns).items():
+        keys = consumers.get((block["id"], name))
+        if keys and is_stream(value):
+            setattr(outputs_ns, name, StreamSource(value, f"{block['name']}.{name}", keys, maxsize, buffered))
+    return outputs_ns
@@ -0,0 +1,155 @@
+# worker.py
+#
+# Long-lived executor process, one per project, started in the project's own
+# interpreter. The GUI writes one JSON command per line on stdin:
+#
+#   {"cmd": "run", "graph": "/tmp/graph.json"}
+#   {"cmd": "cancel"}      stop the current run
+#   {"cmd": "shutdown"}
+#
+# Commands are read on a separate thread so "cancel" arrives while a run is
+# in progress. If a run leaves a block stuck on a thread that can't be
+# interrupted, the worker exits after reporting the run; the GUI starts a
+# fresh one next time.
+#
+# Block output goes to stdout as usual. Progress goes out as framed events on
+# the channel the GUI passed in (see backend/events.py); every run command ends
+# with exactly one run_finished event, even when the executor itself crashes.
+# Modules imported by blocks (numpy, cv2, torch...), compiled code and the
+# state blocks build in setup() (see backend/block_state.py) stay loaded
+# between runs, so only the first run pays for them.
+
+import sys
+import os
+import json
+import queue
+import threading
+import traceback
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from backend.block_executor import run_graph_data, open_result_cache, print
+from backend.code_cache import CodeCache, project_cache_dir
+from backend.events import default_event_writer
+from backend.cancellation import RunControl
+from backend.process_pool import KillableProcessPool
+from backend.preload import graph_modules, worker_context
+from backend.block_state import teardown_all
+
+
+class Worker:
+    def __init__(self):
+        self.events = default_event_writer()
+        self.control = None  # RunControl of the run in progress
+        self.code_caches = {}  # project_dir -> CodeCache (keeps its in-memory memo warm)
+        self.process_pool = None
+        self.process_pool_size = None
+        self.process_pool_modules = set()  # what the pool's workers start with imported
+        self.result_caches = {}  # project_dir -> (settings, ResultCache), so the LRU index stays in memory
+
+    def code_cache_for(self, project_dir):
+        if project_dir not in self.code_caches:
+            self.code_caches[project_dir] = CodeCache(project_cache_dir(project_dir, "code") if project_dir else None)
+        return self.code_caches[project_dir]
+
+    def result_cache_for(self, data):
+        project_dir = data.get("project_dir")
+        settings = (data.get("result_cache_mb"), data.get("result_cache_compression"))
+        cached = self.result_caches.get(project_dir)
+        if cached is None or cached[0] != settings:
+            result_cache = open_result_cache(data)
+            if result_cache is None:
+                return None
+            cached = self.result_caches[project_dir] = (settings, result_cache)
+        return cached[1]
+
+    def process_pool_for(self, data):
+        process_blocks = [b for b in data["blocks"] if b.get("execution_target") == "process"]
+        if not process_blocks:
+            return None
+        max_workers = data.get("max_workers")
+        modules = set(graph_modules(process_blocks))
+        # A graph that imports something new gets workers that start with it loaded
+        if (self.process_pool is None or self.process_pool_size != max_workers
+                or not modules <= self.process_pool_modules):
+            self.shutdown_process_pool()
+            modules |= self.process_pool_modules
+            context, initializer, initargs = worker_context(sorted(modules))
+            self.process_pool = KillableProcessPool(max_workers=max_workers, mp_context=context,
+                                                    initializer=initializer, initargs=initargs)
+            self.process_pool_size = max_workers
+            self.process_pool_modules = modules
+        return self.process_pool
+
+    def shutdown_process_pool(self):
+        if self.process_pool is not None:
+            self.process_pool.shutdown(cancel_futures=True)
+            self.process_pool = None
+
+    def run(self, graph_path):
+        try:
+            with open(graph_path, "r") as f:
+                data = json.load(f)
+        finally:
+            try:
+                os.remove(graph_path)
+            except OSError:
+                pass
+
+        run_graph_data(
+            data,
+            code_cache=self.code_cache_for(data.get("project_dir")),
+            process_pool=self.process_pool_for(data),
+            result_cache=self.result_cache_for(data),
+            events=self.events,
+            control=self.control,
+        )
+
+    def read_commands(self, stream, commands):
+        """Stdin reader thread: cancels act immediately, everything else is queued for serve()."""
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                command = json.loads(line)
+            except ValueError:
+                print(f"⚠️ Worker ignored malformed command: {line!r}", file=sys.stderr)
+                continue
+            if command.get("cmd") == "cancel":
+                control = self.control
+                if control is not None:
+                    control.cancel()
+                continue
+            commands.put(command)
+        commands.put({"cmd": "shutdown"})
+
+    def serve(self, stream):
+        commands = queue.SimpleQueue()
+        threading.Thread(target=self.read_commands, args=(stream, commands), daemon=True).start()
+
+        while True:
+            command = commands.get()
+            if command.get("cmd") == "shutdown":
+                break
+            if command.get("cmd") == "run":
+                self.control = RunControl()
+                try:
+                    self.run(command["graph"])
+                except Exception:
+                    self.events.emit("log", level="error", message=f"Executor error:\n{traceback.format_exc()}")
+                    self.events.emit("run_finished", status="error", wall_s=None)
+                abandoned, self.control = self.control.abandoned, None
+                if abandoned:
+                    self.events.emit("log", level="warning",
+                                     message=f"Restarting the executor to clear stuck block(s): {', '.join(abandoned)}")
+                    self.shutdown_process_pool()
+                    sys.stdout.flush()
+                    os._exit(0)
+
+        self.shutdown_process_pool()
+        teardown_all()
+
+
+if __name__ == "__main__":
+    Worker().serve(sys.stdin)
@@ -78,7 +78,10 @@ class AppController(QMainWindow):
             return
 
         project_data = load_project(Path(path) / "project_settings.json")
-        self.project = Project(project_data['base_path'], project_data['project_type'], project_data['open_terminal'], gen_env=False, env_path=project_data['env_path'], pip_path=project_data['pip_path'], python_path=project_data['python_path'])
+        self.project = Project(project_data['base_path'], project_data['project_type'], project_data['open_terminal'], gen_env=False, env_path=project_data['env_path'], pip_path=project_data['pip_path'], python_path=project_data['python_path'], max_workers=project_data.get('max_workers'),
+                               result_cache_mb=project_data.get('result_cache_mb', 1024), result_cache_compression=project_data.get('result_cache_compression', 'zlib'),
+                               async_limit=project_data.get('async_limit', 32), memory_budget_mb=project_data.get('memory_budget_mb', 0),
+                               trace_memory=project_data.get('trace_memory', False))
         
         self.editor_view = HadronDesignerWindow(self)
         self.stack.addWidget(self.editor_view)
@@ -7,6 +7,7 @@ from block_editors.block_editor import BlockEditor
 from block_editors.variable_block_editor import VariableBlockEditor
 from block_editors.conditional_block_editor import ConditionalBlockEditor
 from block_editors.loop_block_editor import LoopBlockEditor
+from block_editors.map_block_editor import MapBlockEditor
 import uuid
 from PyQt6.QtWidgets import QMenu
 import sys
@@ -17,6 +18,7 @@ sys.path.append(str(Path(__file__).resolve().parents[1]))
 from backend.inputs_proxy import InputsProxy
 from backend.outputs_proxy import OutputsProxy
 from backend.saving import save_to_template
+from backend.graph_file import apply_block_settings
 
 class Block(QGraphicsObject):
     def __init__(self, name, tab_widget, canvas, background_color="#74b9ff", controller=None, requirements=[]):
@@ -26,11 +28,11 @@ class Block(QGraphicsObject):
         self.canvas= canvas
         
         self.name = name
-        self.block_type = "code"
-        self.code = ""
+        # Executor settings (block_type, code, input_mappings, execution_target,
+        # retries, ...) start from the defaults in backend/graph_file.py
+        apply_block_settings(self, {}, skip=("id", "name"))
         self.inputs = InputsProxy()
         self.outputs = OutputsProxy()
-        self.input_mappings = {}
 
         self.tab_widget = tab_widget
         self.width = 140
@@ -39,10 +41,8 @@ class Block(QGraphicsObject):
         self._drag_offset = QPointF()
         self.incoming_connections = []
         self.outgoing_connections = []
-        self.is_start_block = False
         self.background_color= background_color
         self.filepath = None
-        self.requirements=[]
 
 
 
@@ -87,11 +87,15 @@ class Block(QGraphicsObject):
 
         if self.is_start_block:
             painter.setPen(QPen(QColor("green"), 3))
+        elif self.is_sink:
+            painter.setPen(QPen(QColor("#e17055"), 3))
 
         painter.drawRoundedRect(0, 0, self.width, self.height, 10, 10)
 
         # Draw the block name
         painter.setPen(QColor("black"))
+        if self.pinned:
+            painter.drawText(self.width - 22, 18, "📌")
 
         # 🛠️ Ensure name is a string
         name_to_draw = str(self.name) if self.name is not None else "Unnamed Block"
@@ -134,6 +138,19 @@ class Block(QGraphicsObject):
         set_start_action = QAction("Set as Start Block")
         set_start_action.triggered.connect(self.mark_as_start_block)
         menu.addAction(set_start_action)
+        sink_action = QAction("🎯 Unmark as Output" if self.is_sink else "🎯 Mark as Output")
+        sink_action.triggered.connect(self.toggle_sink)
+        menu.addAction(sink_action)
+        pin_action = QAction("📌 Unpin Outputs" if self.pinned else "📌 Pin Outputs")
+        pin_action.triggered.connect(self.toggle_pinned)
+        menu.addAction(pin_action)
+
+        run_from_action = QAction("▶ Run From Here")
+        run_from_action.triggered.connect(lambda: self.run_partial(run_from=self.id))
+        menu.addAction(run_from_action)
+        run_up_to_action = QAction("⏭ Run Up To Here")
+        run_up_to_action.triggered.connect(lambda: self.run_partial(run_up_to=self.id))
+        menu.addAction(run_up_to_action)
 
         save_block_action = QAction("Save Block")
         save_block_action.triggered.connect(lambda: save_to_template(self))
@@ -142,6 +159,14 @@ class Block(QGraphicsObject):
         
 
 
+    def run_partial(self, run_from=None, run_up_to=None):
+        """Run only this block's downstream (run_from) or upstream (run_up_to) part of the graph."""
+        window = getattr(self.controller, "editor_view", None)
+        if window is None:
+            print("❌ No designer window to run from.")
+            return
+        window.run_blocks(run_from=run_from, run_up_to=run_up_to, canvas=self.canvas)
+
     def open_block_editor(self):
         print('🛠 Opening editor for:', self.name, '| block_type:', self.block_type)
 
@@ -160,6 +185,8 @@ class Block(QGraphicsObject):
             editor = ConditionalBlockEditor(self, self.tab_widget, self.canvas)
         elif self.block_type == 'loop':
             editor = LoopBlockEditor(self, self.tab_widget, self.canvas)
+        elif self.block_type == 'map':
+            editor = MapBlockEditor(self, self.tab_widget, self.canvas)
         else:
             print(f"❌ Unknown block type: {self.block_type!r}")
             return  # or raise an error
@@ -211,6 +238,16 @@ class Block(QGraphicsObject):
         self.update()
 
 
+    def toggle_sink(self):
+        """Output blocks decide what a run computes: only they and the blocks they read from run."""
+        self.is_sink = not self.is_sink
+        self.update()
+
+    def toggle_pinned(self):
+        """Pinned outputs stay in memory for the whole run, for inspection, instead of being freed early."""
+        self.pinned = not self.pinned
+        self.update()
+
     def shape(self):
         path = QPainterPath()
         path.addRoundedRect(0, 0, self.width, self.height, 10, 10)
@@ -1,6 +1,7 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QLineEdit, QTextEdit,
-    QPushButton, QListWidget, QListWidgetItem, QInputDialog, QMessageBox, QGroupBox, QHBoxLayout
+    QPushButton, QListWidget, QListWidgetItem, QInputDialog, QMessageBox, QGroupBox, QHBoxLayout,
+    QComboBox, QCheckBox, QSpinBox, QDoubleSpinBox
 )
 from PyQt6.QtCore import pyqtSignal
 import re
@@ -18,6 +19,7 @@ sys.path.append(str(Path(__file__).resolve().parents[2]))
 from backend.inputs_proxy import InputsProxy
 from backend.outputs_proxy import OutputsProxy
 from backend.saving import save_to_template
+from backend.block_runtime import EXECUTION_TARGETS
 
 from frontend.block_editors.requirements_editor import RequirementsEditor
 
@@ -87,6 +89,70 @@ class BlockEditor(QWidget):
         """)
 
 
+        self.layout.addWidget(QLabel("Run On:"))
+        self.target_combo = QComboBox()
+        self.target_combo.addItems(EXECUTION_TARGETS)
+        self.target_combo.setCurrentText(getattr(block, "execution_target", "thread"))
+        self.target_combo.setToolTip(
+            "inline: executor main thread (GUI calls like cv2.imshow)\n"
+            "thread: shared thread pool (I/O, numpy, cv2)\n"
+            "process: worker process (pure-Python CPU-bound code, inputs/outputs must pickle)\n"
+            "Blocks defining `async def run(inputs, outputs)` share one event loop unless set to process.\n"
+            "A block's `setup()` runs once per process it runs on; the body gets its result as `state`."
+        )
+        self.target_combo.currentTextChanged.connect(self.modified.emit)
+        self.layout.addWidget(self.target_combo)
+
+        self.cacheable_check = QCheckBox("Cache results across runs (same code + same inputs)")
+        self.cacheable_check.setChecked(getattr(block, "cacheable", False))
+        self.cacheable_check.toggled.connect(self.modified.emit)
+        self.layout.addWidget(self.cacheable_check)
+
+        stream_row = QHBoxLayout()
+        stream_row.addWidget(QLabel("Stream Buffer (items):"))
+        self.stream_buffer_spin = QSpinBox()
+        self.stream_buffer_spin.setRange(1, 100000)
+        self.stream_buffer_spin.setValue(getattr(block, "stream_buffer", 8))
+        self.stream_buffer_spin.setToolTip("How many items a generator output may run ahead of its slowest consumer")
+        self.stream_buffer_spin.valueChanged.connect(self.modified.emit)
+        stream_row.addWidget(self.stream_buffer_spin)
+        self.layout.addLayout(stream_row)
+
+        timeout_row = QHBoxLayout()
+        timeout_row.addWidget(QLabel("Timeout (s):"))
+        self.timeout_spin = QDoubleSpinBox()
+        self.timeout_spin.setRange(0, 7 * 24 * 3600)
+        self.timeout_spin.setDecimals(1)
+        self.timeout_spin.setSpecialValueText("None")
+        self.timeout_spin.setValue(getattr(block, "timeout_s", 0) or 0)
+        self.timeout_spin.setToolTip("Stop the block if it runs longer than this")
+        self.timeout_spin.valueChanged.connect(self.modified.emit)
+        timeout_row.addWidget(self.timeout_spin)
+        self.layout.addLayout(timeout_row)
+
+        retry_row = QHBoxLayout()
+        retry_row.addWidget(QLabel("Retries:"))
+        self.retries_spin = QSpinBox()
+        self.retries_spin.setRange(0, 100)
+        self.retries_spin.setValue(getattr(block, "retries", 0) or 0)
+        self.retries_spin.setToolTip("Run the block again this many times if it raises (not on timeout or stop)")
+        self.retries_spin.valueChanged.connect(self.modified.emit)
+        retry_row.addWidget(self.retries_spin)
+        retry_row.addWidget(QLabel("Backoff (s):"))
+        self.retry_backoff_spin = QDoubleSpinBox()
+        self.retry_backoff_spin.setRange(0, 300)
+        self.retry_backoff_spin.setDecimals(1)
+        self.retry_backoff_spin.setValue(getattr(block, "retry_backoff_s", 1.0))
+        self.retry_backoff_spin.setToolTip("Wait before the first retry, doubled for each one after")
+        self.retry_backoff_spin.valueChanged.connect(self.modified.emit)
+        retry_row.addWidget(self.retry_backoff_spin)
+        self.layout.addLayout(retry_row)
+
+        self.retry_on_input = QLineEdit(", ".join(getattr(block, "retry_on", [])))
+        self.retry_on_input.setPlaceholderText("Retry on (e.g. ConnectionError, TimeoutError); empty = any error")
+        self.retry_on_input.textChanged.connect(self.modified.emit)
+        self.layout.addWidget(self.retry_on_input)
+
         self.layout.addWidget(QLabel("Inputs:"))
         self.input_list = QListWidget()
         inputs = block.inputs.to_list()
@@ -190,6 +256,13 @@ class BlockEditor(QWidget):
         self.block.update()
 
         self.block.code = self.code_input.toPlainText()
+        self.block.execution_target = self.target_combo.currentText()
+        self.block.cacheable = self.cacheable_check.isChecked()
+        self.block.stream_buffer = self.stream_buffer_spin.value()
+        self.block.timeout_s = self.timeout_spin.value()
+        self.block.retries = self.retries_spin.value()
+        self.block.retry_backoff_s = self.retry_backoff_spin.value()
+        self.block.retry_on = [name.strip() for name in self.retry_on_input.text().split(",") if name.strip()]
 
         # === Extract inputs and outputs from code
         code = self.block.code
@@ -55,9 +55,11 @@ class ConditionalBlockEditor(QWidget):
 
         # Add Else block
         self.else_label = QLabel("else:")
+        self.else_branch = self.branch_input()
         self.else_code = QTextEdit()
         self.else_code.textChanged.connect(self.modified.emit)
         self.condition_block_layout.addWidget(self.else_label)
+        self.condition_block_layout.addWidget(self.else_branch)
         self.condition_block_layout.addWidget(self.else_code)
 
         # Save and Show Code button
@@ -84,28 +86,41 @@ class ConditionalBlockEditor(QWidget):
         self.block.update()
 
 
-    def add_condition_block(self, block_type, condition="", code=""):
+    def branch_input(self, branch=""):
+        branch_input = QLineEdit(branch)
+        branch_input.setPlaceholderText("Branch output (optional)")
+        branch_input.setToolTip(
+            "Output set only when this branch is taken. Blocks connected to it, and everything\n"
+            "after them, are skipped when the block takes another branch."
+        )
+        branch_input.textChanged.connect(self.modified.emit)
+        return branch_input
+
+    def add_condition_block(self, block_type, condition="", code="", branch=""):
         block_widget = QWidget()
         row_layout = QVBoxLayout(block_widget)
 
         label = QLabel(f"{block_type} condition:")
         condition_input = QLineEdit(condition)
         condition_input.textChanged.connect(self.modified.emit)
+        branch_input = self.branch_input(branch)
         code_input = QTextEdit()
         code_input.setPlainText(code)
         code_input.textChanged.connect(self.modified.emit)
 
         row_layout.addWidget(label)
         row_layout.addWidget(condition_input)
+        row_layout.addWidget(branch_input)
         row_layout.addWidget(code_input)
 
-        # Insert before the else: section (which is the last 2 widgets in layout)
-        insert_index = self.condition_block_layout.count() - 2
+        # Insert before the else: section (which is the last 3 widgets in layout)
+        insert_index = self.condition_block_layout.count() - 3
         self.condition_block_layout.insertWidget(insert_index, block_widget)
 
         self.condition_blocks.append({
             "type": block_type,
             "condition_input": condition_input,
+            "branch_input": branch_input,
             "code_input": code_input,
             "widget": block_widget
         })
@@ -116,24 +131,27 @@ class ConditionalBlockEditor(QWidget):
         self.tab_widget.setTabText(self.tab_widget.indexOf(self), self.block.name)
 
         code_lines = []
-        for block in self.condition_blocks:
-            cond_type = block["type"]
-            condition = block["condition_input"].text().strip()
-            code = block["code_input"].toPlainText().strip()
-
-            if not condition:
+        branches = []
+        arms = [(block["type"], block["condition_input"].text().strip(), block["branch_input"].text().strip(),
+                 block["code_input"].toPlainText().strip()) for block in self.condition_blocks]
+        arms.append(("else", None, self.else_branch.text().strip(), self.else_code.toPlainText().strip()))
+        for cond_type, condition, branch, code in arms:
+            if condition is not None and not condition:
                 QMessageBox.warning(self, "Missing Condition", f"{cond_type} condition is empty.")
                 return
+            if branch and not branch.isidentifier():
+                QMessageBox.warning(self, "Invalid Branch", f"Branch output '{branch}' is not a valid name.")
+                return
 
-            code_lines.append(f"{cond_type} {condition}:")
+            code_lines.append(f"{cond_type} {condition}:" if condition is not None else "else:")
+            # The executor prunes what hangs off the branches that don't get set
+            if branch:
+                code_lines.append(f"    outputs.{branch} = True")
+                branches.append(branch)
             for line in code.splitlines():
                 code_lines.append(f"    {line}")
-
-        # Add else
-        else_code = self.else_code.toPlainText().strip()
-        code_lines.append("else:")
-        for line in else_code.splitlines():
-            code_lines.append(f"    {line}")
+            if not branch and not code:
+                code_lines.append("    pass")
 
         full_code = "\n".join(code_lines)
         self.block.code = full_code
@@ -151,6 +169,7 @@ class ConditionalBlockEditor(QWidget):
 
         self.block.inputs.set_names(inputs)
         self.block.outputs.set_names(outputs)
+        self.block.branches = list(dict.fromkeys(branches))
         self.block.requirements = self.req_editor.get_requirements()
         self.block.update()
         print(f"💾 Saved block '{self.block.name}'")
@@ -162,6 +181,15 @@ class ConditionalBlockEditor(QWidget):
             return
 
         lines = code.splitlines()
+        branches = getattr(self.block, "branches", [])
+
+        def split_branch(code_block):
+            first = code_block[0] if code_block else ""
+            for branch in branches:
+                if first == f"outputs.{branch} = True":
+                    return branch, code_block[1:]
+            return "", code_block
+
         i = 0
         while i < len(lines):
             line = lines[i].strip()
@@ -173,13 +201,16 @@ class ConditionalBlockEditor(QWidget):
                 while i < len(lines) and lines[i].startswith("    "):
                     code_block.append(lines[i].strip())
                     i += 1
-                self.add_condition_block(cond_type, condition, "\n".join(code_block))
+                branch, code_block = split_branch(code_block)
+                self.add_condition_block(cond_type, condition, "\n".join(code_block), branch)
             elif line.startswith("else:"):
                 else_block = []
                 i += 1
                 while i < len(lines) and lines[i].startswith("    "):
                     else_block.append(lines[i].strip())
                     i += 1
+                branch, else_block = split_branch(else_block)
+                self.else_branch.setText(branch)
                 self.else_code.setPlainText("\n".join(else_block))
             else:
                 i += 1
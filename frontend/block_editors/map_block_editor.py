@@ -0,0 +1,132 @@
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QLabel, QLineEdit, QPushButton, QHBoxLayout, QSpinBox, QFileDialog, QMessageBox
+)
+from PyQt6.QtCore import pyqtSignal
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from backend.inputs_proxy import InputsProxy
+from backend.outputs_proxy import OutputsProxy
+from backend.saving import save_to_template
+from backend.map_block import ITEMS_INPUT
+
+
+class MapBlockEditor(QWidget):
+    """Settings of a map block: the sub-graph it runs per item and how the work is spread out."""
+    modified = pyqtSignal()
+    saved = pyqtSignal()
+
+    def __init__(self, block, tab_widget, canvas):
+        super().__init__()
+        self.block = block
+        self.canvas = canvas
+        self.tab_widget = tab_widget
+        self.setStyleSheet("color: black;")
+        self.layout = QVBoxLayout(self)
+
+        self.layout.addWidget(QLabel("Block Name:"))
+        self.name_input = QLineEdit(block.name)
+        self.name_input.textChanged.connect(self.modified.emit)
+        self.layout.addWidget(self.name_input)
+
+        # ========== Sub-graph ==========
+        self.layout.addWidget(QLabel("Sub-graph run for each item (.quark):"))
+        graph_row = QHBoxLayout()
+        self.graph_input = QLineEdit(getattr(block, "map_graph", None) or "")
+        self.graph_input.setPlaceholderText("e.g. pipelines/process_one.quark")
+        self.graph_input.textChanged.connect(self.modified.emit)
+        graph_row.addWidget(self.graph_input)
+        browse_button = QPushButton("📂 Browse")
+        browse_button.clicked.connect(self.browse_graph)
+        graph_row.addWidget(browse_button)
+        self.layout.addLayout(graph_row)
+
+        self.layout.addWidget(QLabel(
+            f"Each element of inputs.{ITEMS_INPUT} is laid over the sub-graph's start block outputs\n"
+            "(dicts field by field, anything else as 'value'). Results come back in order as\n"
+            "outputs.results, failed elements in outputs.errors."
+        ))
+
+        self.layout.addWidget(QLabel("Extra inputs passed to every item (comma separated):"))
+        extra_inputs = [name for name in block.inputs.to_list() if name != ITEMS_INPUT]
+        self.extra_inputs_input = QLineEdit(", ".join(extra_inputs))
+        self.extra_inputs_input.textChanged.connect(self.modified.emit)
+        self.layout.addWidget(self.extra_inputs_input)
+
+        # ========== Pool ==========
+        pool_row = QHBoxLayout()
+        pool_row.addWidget(QLabel("Workers:"))
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(0, 512)
+        self.workers_spin.setSpecialValueText("Auto")
+        self.workers_spin.setValue(getattr(block, "map_workers", 0) or 0)
+        self.workers_spin.valueChanged.connect(self.modified.emit)
+        pool_row.addWidget(self.workers_spin)
+
+        pool_row.addWidget(QLabel("Chunk Size:"))
+        self.chunksize_spin = QSpinBox()
+        self.chunksize_spin.setRange(0, 1000000)
+        self.chunksize_spin.setSpecialValueText("Auto")
+        self.chunksize_spin.setValue(getattr(block, "map_chunksize", 0) or 0)
+        self.chunksize_spin.setToolTip("Items handed to a worker at a time; larger chunks mean less overhead for cheap items")
+        self.chunksize_spin.valueChanged.connect(self.modified.emit)
+        pool_row.addWidget(self.chunksize_spin)
+        self.layout.addLayout(pool_row)
+
+        # ========== Buttons ==========
+        self.save_button = QPushButton("💾 Save")
+        self.save_button.clicked.connect(self.save_changes)
+        self.layout.addWidget(self.save_button)
+
+        save_block_button = QPushButton("💾 Save Block to File")
+        save_block_button.setStyleSheet("""
+            font-size: 14px;
+            color: black;
+            border: 2px solid black;
+            border-radius: 6px;
+            padding: 6px 12px;
+        """)
+        save_block_button.clicked.connect(lambda: save_to_template(block))
+        self.layout.addWidget(save_block_button)
+        self.layout.addStretch()
+
+    def project_dir(self):
+        project = getattr(self.block.controller, "project", None)
+        return Path(project.base_path) if project is not None else None
+
+    def browse_graph(self):
+        start_dir = str(self.project_dir() or "")
+        path, _ = QFileDialog.getOpenFileName(self, "Select Sub-graph", start_dir, "Quark Files (*.quark)")
+        if not path:
+            return
+        # Keep paths inside the project relative so the project can move
+        project_dir = self.project_dir()
+        if project_dir is not None:
+            try:
+                path = os.path.relpath(path, project_dir) if Path(path).resolve().is_relative_to(project_dir.resolve()) else path
+            except ValueError:
+                pass
+        self.graph_input.setText(path)
+
+    def save_changes(self):
+        graph = self.graph_input.text().strip()
+        if not graph:
+            QMessageBox.warning(self, "Missing Sub-graph", "Please choose the .quark file to run for each item.")
+            return
+
+        self.block.name = self.name_input.text()
+        self.tab_widget.setTabText(self.tab_widget.indexOf(self), self.block.name)
+        self.block.map_graph = graph
+        self.block.map_workers = self.workers_spin.value()
+        self.block.map_chunksize = self.chunksize_spin.value()
+
+        extra_inputs = [name.strip() for name in self.extra_inputs_input.text().split(",") if name.strip()]
+        self.block.inputs = InputsProxy()
+        self.block.outputs = OutputsProxy()
+        self.block.inputs.set_names([ITEMS_INPUT] + [name for name in extra_inputs if name != ITEMS_INPUT])
+        self.block.outputs.set_names(["results", "errors"])
+        self.block.update()
+        print(f"💾 Saved block '{self.block.name}'")
+        self.saved.emit()
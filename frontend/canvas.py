@@ -39,6 +39,7 @@ class Canvas(QGraphicsView):
     def __init__(self, tab_widget, controller):
         super().__init__()
         self.filepath= None
+        self.run_timeout_s = 0  # whole-run time limit in seconds, 0 for none; saved in the .quark
         
         self.tab_widget = tab_widget
         self.controller = controller
@@ -328,6 +329,16 @@ class Canvas(QGraphicsView):
         self.scene.addItem(block)
         self.blocks.append(block)
 
+    def add_map_block(self):
+        self.modified.emit()
+
+        name = f"Map Block {len(self.blocks) + 1}"
+        block = Block(name, self.tab_widget, self, background_color="#a29bfe", controller=self.controller)
+        block.block_type = "map"
+        block.setPos(50 + len(self.blocks) * 20, 100)
+        self.scene.addItem(block)
+        self.blocks.append(block)
+
     def add_start_block(self):
         self.modified.emit()
 
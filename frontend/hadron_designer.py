@@ -1,6 +1,6 @@
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
-    QMainWindow, QTabWidget, QMenuBar, QMenu, QFileDialog, QTextEdit, QMessageBox
+    QMainWindow, QTabWidget, QMenuBar, QMenu, QFileDialog, QTextEdit, QMessageBox, QInputDialog
 )
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QTextCursor, QAction
@@ -16,9 +16,10 @@ import os
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
-from backend.engine import run_all_blocks
+from backend.engine import run_all_blocks, stop_run, compile_canvas
 from backend.saving import save_to_template
 from backend.loading import load_file
+from backend.profiling import format_bytes
 
 class HadronDesignerWindow(QMainWindow):
     def __init__(self, controller=None):
@@ -27,6 +28,7 @@ class HadronDesignerWindow(QMainWindow):
         self.canvas_tabs = {}
         self.canvas_to_tab = {}
         self.open_file_tabs = {}  # maps file paths to tab widgets
+        self.running_canvas = None  # canvas of the run the executor is reporting on
 
 
         # === Menu Bar ===
@@ -83,6 +85,8 @@ class HadronDesignerWindow(QMainWindow):
         self.add_block_button = None
         self.run_button = None
         self.add_block_menu = None
+        self.run_menu = None
+        self.stop_button = None
 
         self.bottom_row = QHBoxLayout()
         self.bottom_row.addStretch()
@@ -234,6 +238,11 @@ class HadronDesignerWindow(QMainWindow):
                 self.run_button.deleteLater()
                 self.run_button = None
 
+            if self.stop_button is not None:
+                self.bottom_row.removeWidget(self.stop_button)
+                self.stop_button.deleteLater()
+                self.stop_button = None
+
             # === Create new menu and buttons ===
             self.add_block_menu = QMenu(self)
             self.add_block_menu.addAction("➕ Add Blank Block", canvas.add_block)
@@ -241,6 +250,7 @@ class HadronDesignerWindow(QMainWindow):
             self.add_block_menu.addAction("🔣 Add Variable Block", canvas.add_variable_block)
             self.add_block_menu.addAction("🔀 Add Conditional Block", canvas.add_conditional_block)
             self.add_block_menu.addAction("🔁 Add Loop Block", canvas.add_loop_block)
+            self.add_block_menu.addAction("🗺️ Add Map Block", canvas.add_map_block)
 
             self.add_block_button = QPushButton("➕ Add Block")
             self.add_block_button.setFixedWidth(200)
@@ -251,13 +261,32 @@ class HadronDesignerWindow(QMainWindow):
             ))
             self.add_block_button.installEventFilter(self)
 
+            self.run_menu = QMenu(self)
+            self.run_menu.addAction("▶ Run All", lambda: self.run_blocks())
+            self.run_menu.addAction("⏩ Run Changed Only", lambda: self.run_blocks(changed_only=True))
+            self.run_menu.addAction("⏯ Run Every Block (Ignore Outputs)", lambda: self.run_blocks(all_blocks=True))
+            self.run_menu.addAction("🔁 Resume Last Run", lambda: self.run_blocks(resume="last"))
+            self.run_menu.addSeparator()
+            self.run_menu.addAction("⏱️ Set Run Timeout...", self.set_run_timeout)
+            self.run_menu.addAction("📦 Compile Graph to Module", self.compile_graph)
+
             self.run_button = QPushButton("▶ Run")
             self.run_button.setFixedWidth(200)
             self.run_button.setStyleSheet("font-size: 16px; padding: 10px; color: black; border: 2px solid black; border-radius: 8px;")
             self.run_button.setCursor(Qt.CursorShape.PointingHandCursor)
-            self.run_button.clicked.connect(self.run_blocks)
+            self.run_button.setToolTip("Right-click for more run options")
+            self.run_button.clicked.connect(lambda: self.run_blocks())
+            self.run_button.installEventFilter(self)
+
+            self.stop_button = QPushButton("⛔ Stop")
+            self.stop_button.setFixedWidth(120)
+            self.stop_button.setStyleSheet("font-size: 16px; padding: 10px; color: black; border: 2px solid black; border-radius: 8px;")
+            self.stop_button.setCursor(Qt.CursorShape.PointingHandCursor)
+            self.stop_button.setToolTip("Stop the current run")
+            self.stop_button.clicked.connect(lambda: stop_run(self))
 
             self.bottom_row.addWidget(self.run_button)
+            self.bottom_row.addWidget(self.stop_button)
             self.bottom_row.addWidget(self.add_block_button)
 
         return canvas, canvas_tab
@@ -299,15 +328,49 @@ class HadronDesignerWindow(QMainWindow):
     def clear_output_box(self):
         self.output_box.clear()
 
-    def run_blocks(self):
+    def run_blocks(self, changed_only=False, run_from=None, run_up_to=None, canvas=None, all_blocks=False, resume=None):
+        if canvas is None:
+            canvas = self.get_current_canvas()
+        if canvas is None:
+            print("❌ No canvas found for current tab.")
+            return
+        if resume:
+            print(f"🔁 Resuming the last run of canvas: {canvas.filepath}")
+        elif run_from or run_up_to:
+            block = next((b for b in canvas.blocks if b.id in (run_from, run_up_to)), None)
+            label = "from" if run_from else "up to"
+            print(f"▶ Executing blocks {label} {block.name if block else '?'} for canvas: {canvas.filepath}")
+        elif not all_blocks and any(getattr(b, "is_sink", False) for b in canvas.blocks):
+            print(f"🎯 Executing the output blocks and what they need for canvas: {canvas.filepath}")
+        elif changed_only:
+            print(f"⏩ Executing changed blocks for canvas: {canvas.filepath}")
+        else:
+            print(f"▶ Executing all blocks for canvas: {canvas.filepath}")
+        canvas.rebuild_wiring()
+        self.running_canvas = canvas
+        run_all_blocks(self, canvas, changed_only=changed_only, run_from=run_from, run_up_to=run_up_to, all_blocks=all_blocks,
+                       resume=resume)
+
+
+    def compile_graph(self):
         canvas = self.get_current_canvas()
         if canvas is None:
             print("❌ No canvas found for current tab.")
             return
-        print(f"▶ Executing all blocks for canvas: {canvas.filepath}")
         canvas.rebuild_wiring()
-        run_all_blocks(self, canvas)
+        compile_canvas(self, canvas)
 
+    def set_run_timeout(self):
+        canvas = self.get_current_canvas()
+        if canvas is None:
+            return
+        seconds, ok = QInputDialog.getDouble(
+            self, "Run Timeout", "Stop the whole run after (seconds, 0 = no limit):",
+            getattr(canvas, "run_timeout_s", 0) or 0, 0, 7 * 24 * 3600, 1
+        )
+        if ok:
+            canvas.run_timeout_s = seconds
+            self.mark_canvas_tab_modified(canvas)
 
     def save_layout_prompt(self):
         path, _ = QFileDialog.getSaveFileName(self, "Save Layout", "", "JSON Files (*.json)")
@@ -445,6 +508,51 @@ class HadronDesignerWindow(QMainWindow):
         self.output_box.moveCursor(QTextCursor.MoveOperation.End)
         self.output_box.insertPlainText(text)
 
+    def handle_executor_event(self, event):
+        """Per-block UI updates from the executor's event channel (see backend/events.py)."""
+        if self.running_canvas is None or "block_id" not in event:
+            return
+        block = next((b for b in self.running_canvas.blocks if b.id == event["block_id"]), None)
+        if block is None:
+            return
+
+        kind = event.get("event")
+        if kind == "block_started":
+            block.run_report = {}
+            block.setToolTip(f"Running on {event['target']}...")
+            return
+        report = getattr(block, "run_report", None)
+        if report is None:
+            report = block.run_report = {}
+
+        if kind == "block_failed":
+            report["error"] = event.get("traceback") or event["error"]
+        elif kind == "block_skipped":
+            report["outputs"] = f"Skipped: {event['reason']}"
+        elif kind == "value_summary":
+            report["outputs"] = "\n".join(
+                f"{name}: {summary['type']}"
+                + (f" {tuple(summary['shape'])}" if "shape" in summary else "")
+                + (f" {summary['dtype']}" if "dtype" in summary else "")
+                + (f" len={summary['len']}" if "len" in summary else "")
+                + f" = {summary['repr']}"
+                for name, summary in event["outputs"].items()
+            )
+        elif kind == "metric" and event.get("scope") == "block":
+            if event.get("wall_s") is None:
+                report["profile"] = f"Last run: {event['status']}"
+            else:
+                cpu = f"{event['cpu_s']:.3f}s CPU, " if event.get("cpu_s") is not None else ""
+                report["profile"] = (
+                    f"Last run: {event['status']} on {event['target']}\n"
+                    f"{event['wall_s']:.3f}s wall, {cpu}peak {format_bytes(event.get('peak_mem_bytes'))}, "
+                    f"output {format_bytes(event.get('output_bytes'))}"
+                )
+        else:
+            return
+
+        block.setToolTip("\n\n".join(report[k] for k in ("profile", "outputs", "error") if report.get(k)))
+
     def redirector(self, inputStr):
         self.output_box.moveCursor(QTextCursor.MoveOperation.End)
         self.output_box.insertPlainText(inputStr)
@@ -454,6 +562,10 @@ class HadronDesignerWindow(QMainWindow):
             if event.button() == Qt.MouseButton.RightButton:
                 self.add_block_menu.exec(self.add_block_button.mapToGlobal(event.position().toPoint()))
                 return True
+        if self.run_button and source == self.run_button and event.type() == event.Type.MouseButtonPress:
+            if event.button() == Qt.MouseButton.RightButton:
+                self.run_menu.exec(self.run_button.mapToGlobal(event.position().toPoint()))
+                return True
         return super().eventFilter(source, event)
     
     def toggle_terminal_visibility(self):
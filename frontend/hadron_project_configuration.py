@@ -1,7 +1,7 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QLineEdit, QPushButton,
     QFileDialog, QComboBox, QHBoxLayout, QMessageBox, QGroupBox,
-    QFormLayout, QTableWidget, QTableWidgetItem, QHeaderView
+    QFormLayout, QTableWidget, QTableWidgetItem, QHeaderView, QCheckBox
 )
 from PyQt6.QtCore import Qt
 import importlib.metadata
@@ -12,7 +12,7 @@ import requests
 from PyQt6.QtWidgets import QLineEdit, QCompleter, QMessageBox
 from PyQt6.QtCore import QTimer
 import json
-from PyQt6.QtWidgets import QMenu
+from PyQt6.QtWidgets import QMenu, QSpinBox
 
 
 from PyQt6.QtWidgets import QWidget, QHBoxLayout, QPushButton, QSizePolicy
@@ -105,6 +105,43 @@ class HadronProjectConfiguration(QWidget):
         self.type_combo.setCurrentText(controller.project.project_type)
         overview_layout.addRow("Project Type:", self.type_combo)
 
+        # 0 means "auto" (let the executor size the pool from the CPU count)
+        self.max_workers_spin = QSpinBox()
+        self.max_workers_spin.setRange(0, 256)
+        self.max_workers_spin.setSpecialValueText("Auto")
+        self.max_workers_spin.setValue(controller.project.max_workers or 0)
+        overview_layout.addRow("Max Parallel Blocks:", self.max_workers_spin)
+
+        self.async_limit_spin = QSpinBox()
+        self.async_limit_spin.setRange(1, 10000)
+        self.async_limit_spin.setValue(controller.project.async_limit)
+        self.async_limit_spin.setToolTip("How many async blocks may be waiting on I/O at once")
+        overview_layout.addRow("Max Concurrent Async Blocks:", self.async_limit_spin)
+
+        self.memory_budget_spin = QSpinBox()
+        self.memory_budget_spin.setRange(0, 1024 * 1024)
+        self.memory_budget_spin.setSuffix(" MB")
+        self.memory_budget_spin.setSpecialValueText("No limit")
+        self.memory_budget_spin.setValue(controller.project.memory_budget_mb)
+        self.memory_budget_spin.setToolTip("Block outputs a run may hold in memory before large arrays and bytes spill to disk")
+        overview_layout.addRow("Run Memory Budget:", self.memory_budget_spin)
+
+        self.trace_memory_check = QCheckBox()
+        self.trace_memory_check.setChecked(controller.project.trace_memory)
+        self.trace_memory_check.setToolTip("Measure each block's peak memory (tracemalloc); makes allocation-heavy blocks slower")
+        overview_layout.addRow("Trace Block Memory:", self.trace_memory_check)
+
+        self.result_cache_spin = QSpinBox()
+        self.result_cache_spin.setRange(1, 1024 * 1024)
+        self.result_cache_spin.setSuffix(" MB")
+        self.result_cache_spin.setValue(controller.project.result_cache_mb)
+        overview_layout.addRow("Result Cache Size:", self.result_cache_spin)
+
+        self.result_compression_combo = QComboBox()
+        self.result_compression_combo.addItems(["none", "zlib", "lzma"])
+        self.result_compression_combo.setCurrentText(controller.project.result_cache_compression)
+        overview_layout.addRow("Result Cache Compression:", self.result_compression_combo)
+
         overview_box.setLayout(overview_layout)
         main_layout.addWidget(overview_box)
 
@@ -489,6 +526,12 @@ class HadronProjectConfiguration(QWidget):
     def save_project(self, name, project_type):
         self.controller.project.name =  name
         self.controller.project.project_type = project_type
+        self.controller.project.max_workers = self.max_workers_spin.value() or None
+        self.controller.project.async_limit = self.async_limit_spin.value()
+        self.controller.project.memory_budget_mb = self.memory_budget_spin.value()
+        self.controller.project.trace_memory = self.trace_memory_check.isChecked()
+        self.controller.project.result_cache_mb = self.result_cache_spin.value()
+        self.controller.project.result_cache_compression = self.result_compression_combo.currentText()
         self.controller.project.save()
         print('Project is saved')
         